@@ -0,0 +1,88 @@
+'''
+Measures the per call overhead of functions decorated with validate() and parse().
+Run it from the root directory of the repository:
+python -m benchmarks.bench_calls
+'''
+
+from timeit import repeat
+from time import perf_counter
+import asyncio
+from src.decorators import validate, parse
+from src.operations import arg
+
+
+def bench(func, *args, number=200000):
+    '''
+    Returns the best time (in nanoseconds) per call of func(*args)
+    '''
+    return min(repeat(lambda: func(*args), number=number, repeat=5)) / number * 1e9
+
+
+def report(title, timings):
+    print(title)
+    base = timings[0][1]
+    for label, t in timings:
+        print('    {:<24} {:>8.0f} ns/call {:>+8.0f} ns'.format(label, t, t - base))
+
+
+def main():
+    def plain(x, y, z=1):
+        return x
+
+    validated = validate(int, str, float)(plain)
+    parsed = parse(None, str, None)(validate(int, str, float)(plain))
+    sampled = validate(int, str, float, sample=0.01)(plain)
+
+    for title, wrapper, args in (
+            ('validate(int, str, float)', validated, (1, 'a')),
+            ('parse() + validate()', parsed, (1, 2, 1.0)),
+            ('validate(..., sample=0.01)', sampled, (1, 'a'))):
+        report(title, [
+            ('undecorated', bench(plain, *args)),
+            ('generated caller', bench(wrapper, *args)),
+            ('generic (Signature.bind)', bench(wrapper.call_generic, *args))
+        ])
+
+    rows = [(k, 'a', 1.0) for k in range(0, 10000)]
+    report('validate(int, str, float) over {} rows (per row)'.format(len(rows)), [
+        ('undecorated', bench(lambda: [plain(*args) for args in rows], number=20) / len(rows)),
+        ('generated caller', bench(lambda: [validated(*args) for args in rows], number=20) / len(rows)),
+        ('starmap()', bench(lambda: list(validated.starmap(rows)), number=20) / len(rows))
+    ])
+
+    checked = validate((arg >= 0) & (arg < 100000), str, float)(plain)
+    report('validate((arg >= 0) & (arg < 100000), str, float) over {} rows (per row)'.format(len(rows)), [
+        ('undecorated', bench(lambda: [plain(*args) for args in rows], number=20) / len(rows)),
+        ('generated caller', bench(lambda: [checked(*args) for args in rows], number=20) / len(rows)),
+        ('starmap()', bench(lambda: list(checked.starmap(rows)), number=20) / len(rows))
+    ])
+
+    expr = (arg > 0) & (arg < 100)
+    report('expression (arg > 0) & (arg < 100)', [
+        ('lambda', bench(lambda x: (x > 0) & (x < 100), 5)),
+        ('compiled', bench(expr.compile(), 5)),
+        ('tree walk', bench(expr, 5))
+    ])
+
+    async def coroutine(x, y, z=1):
+        return x
+
+    async def drive(func, args, number):
+        start = perf_counter()
+        for k in range(0, number):
+            await func(*args)
+        return (perf_counter() - start) / number * 1e9
+
+    def bench_async(func, *args, number=100000):
+        return min(asyncio.run(drive(func, args, number)) for k in range(0, 5))
+
+    wrapper = validate(int, str, float)(coroutine)
+    report('async validate(int, str, float) (call + await)', [
+        ('undecorated', bench_async(coroutine, 1, 'a')),
+        ('generated caller', bench_async(wrapper, 1, 'a')),
+        ('generic (Signature.bind)', bench_async(wrapper.call_generic, 1, 'a'))
+    ])
+
+
+if __name__ == '__main__':
+    main()
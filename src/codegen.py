@@ -0,0 +1,164 @@
+'''
+This module defines the routines used to generate the specialized functions that FuncWrapper instances invoke when
+they are called: They bind, process and forward the input arguments without building intermediate BoundArguments
+objects or tuples.
+'''
+
+from inspect import Parameter
+from keyword import iskeyword
+from random import random
+from .utils import overrides_class
+
+
+# All the names defined by the generated code start with this prefix
+PREFIX = '_vpf_'
+
+
+class Missing:
+    '''
+    Class of the object used as default value by the generated functions to know which arguments were not specified by
+    the caller.
+    '''
+    def __repr__(self):
+        return '<missing>'
+
+missing = Missing()
+
+
+def get_params(wrapper):
+    '''
+    Returns the parameters of the function wrapped by the given FuncWrapper instance or None if a function with the
+    same parameter list cannot be generated (it has variadic or keyword only parameters)
+    '''
+    params = tuple(wrapper.signature.parameters.values())
+    if not all(param.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD) for param in params):
+        return None
+    if any(param.name.startswith(PREFIX) for param in params):
+        return None
+    return params
+
+
+def format_params(params):
+    '''
+    Returns the parameter list of a generated function with the given parameters. The default value of the parameters
+    is replaced with the object missing.
+    '''
+    defs = []
+    for index, param in enumerate(params):
+        defs.append(param.name if param.default is Parameter.empty else '{}={}missing'.format(param.name, PREFIX))
+        if param.kind == Parameter.POSITIONAL_ONLY and \
+                (index+1 == len(params) or params[index+1].kind != Parameter.POSITIONAL_ONLY):
+            defs.append('/')
+    return ', '.join(defs)
+
+
+def build(wrapper, params, body, namespace):
+    '''
+    Compiles a function with the given parameters and body (a list of lines of code)
+    :param namespace: Global variables of the function
+    :return: Returns the generated function
+    '''
+    name = getattr(wrapper.wrapped_func, '__name__', None)
+    if not isinstance(name, str) or not name.isidentifier() or iskeyword(name) or name.startswith(PREFIX):
+        name = PREFIX + 'call'
+
+    namespace[PREFIX + 'missing'] = missing
+    source = 'def {}({}):\n{}\n'.format(name, format_params(params), '\n'.join('    ' + line for line in body))
+    exec(compile(source, '<vpfargs {}>'.format(name), 'exec'), namespace)
+    return namespace[name]
+
+
+def compile_binder(wrapper):
+    '''
+    Generates a function with the same parameter list as the function wrapped by the given FuncWrapper instance that
+    returns a tuple with its arguments (unspecified arguments with default values are set to the object missing)
+    :return: Returns the generated function or None if the wrapper cannot be specialized.
+    '''
+    params = get_params(wrapper)
+    if params is None:
+        return None
+    return build(wrapper, params, ['return ({},)'.format(', '.join(param.name for param in params))] if params else
+                 ['return ()'], {})
+
+
+def compile_caller(wrapper, chains, types=None):
+    '''
+    Generates a function with the same parameter list as the function wrapped by the given FuncWrapper instance.
+    When invoked, it validates and parses its arguments with the processors of the wrapper and then calls the wrapped
+    function with the resulting values.
+    :param wrapper: Must be an instance of the class FuncWrapper
+    :param chains: The chains of stages applied to each argument (see ProcessorBundle.fuse())
+    :param types: An optional set of tuples with the types of arguments known to be valid. If indicated, the arguments
+    are only validated if the tuple of their types is not in the set (then its added to it, up to
+    wrapper.type_cache_size tuples). Must only be used if all the stages are validators whose result only depend
+    on the types of the arguments.
+    :return: Returns the generated function or None if the wrapper cannot be specialized (the wrapped function have
+    variadic or keyword only parameters, or the processors of the wrapper cannot be fused; see ProcessorBundle.fuse())
+    '''
+    params = get_params(wrapper)
+    if params is None:
+        return None
+    if chains is None or (len(chains) != len(params) and len(wrapper.processors) > 0):
+        return None
+
+    # Builtins are bound too: parameters can shadow them
+    namespace = {PREFIX + 'func': wrapper.wrapped_func, PREFIX + 'Exception': Exception}
+    for index, param in enumerate(params):
+        if param.default is not Parameter.empty:
+            namespace['{}default_{}'.format(PREFIX, index)] = param.default.wrapped_value
+
+    # Body: First decide which processors validate the arguments in this call (if validation is sampled)
+    body, samplers = [], {}
+    for chain in chains:
+        for stage in chain:
+            sampler = wrapper.get_sampler(stage.processor)
+            if sampler is not None and sampler not in samplers:
+                name = '{}sampled_{}'.format(PREFIX, len(samplers))
+                samplers[sampler] = name
+                if sampler.random:
+                    namespace[PREFIX + 'random'] = random
+                    body.append('{} = {}random() < {!r}'.format(name, PREFIX, sampler.rate))
+                else:
+                    namespace[name + '_counter'] = sampler.counter.__next__
+                    body.append('{0} = {0}_counter() % {1} == 0'.format(name, sampler.period))
+
+    # Then, apply the chain of stages of each argument
+    for index, (param, chain) in enumerate(zip(params, chains)):
+        lines = []
+        for position, stage in enumerate(chain):
+            name = '{}s{}_{}'.format(PREFIX, index, position)
+            namespace[name], namespace[name + '_item'] = stage, stage.item
+            code = [
+                'try:',
+                '    {}{}_item({})'.format('' if stage.validates else param.name + ' = ', name, param.name),
+                'except {0}Exception as {0}e:'.format(PREFIX),
+                '    raise {}.error({}e)'.format(name, PREFIX)
+            ]
+            sampler = wrapper.get_sampler(stage.processor)
+            if sampler is not None:
+                code = ['if {}:'.format(samplers[sampler])] + ['    ' + line for line in code]
+            lines.extend(code)
+        if lines and param.default is not Parameter.empty:
+            # Default values are not validated neither parsed
+            lines = ['if {} is not {}missing:'.format(param.name, PREFIX)] + ['    ' + line for line in lines]
+        body.extend(lines)
+
+    if types is not None and body:
+        # The tuple of types is compared with the ones of previous valid calls
+        # Types whose instances can report other classes (proxies) are never stored
+        namespace[PREFIX + 'type'], namespace[PREFIX + 'types'] = type, types
+        namespace[PREFIX + 'overrides_class'] = overrides_class
+        namespace[PREFIX + 'len'], namespace[PREFIX + 'any'], namespace[PREFIX + 'map'] = len, any, map
+        key = '({},)'.format(', '.join('{}type({})'.format(PREFIX, param.name) for param in params))
+        body = ['{}key = {}'.format(PREFIX, key), 'if {0}key not in {0}types:'.format(PREFIX)] + \
+               ['    ' + line for line in body] + [
+                   '    if {0}len({0}types) < {1!r} and not {0}any({0}map({0}overrides_class, {0}key)):'.format(
+                       PREFIX, wrapper.type_cache_size),
+                   '        {0}types.add({0}key)'.format(PREFIX)]
+
+    for index, param in enumerate(params):
+        if param.default is not Parameter.empty:
+            body.append('if {} is {}missing:'.format(param.name, PREFIX))
+            body.append('    {} = {}default_{}'.format(param.name, PREFIX, index))
+    body.append('return {}func({})'.format(PREFIX, ', '.join(param.name for param in params)))
+    return build(wrapper, params, body, namespace)
@@ -5,7 +5,7 @@ validate is an alias of ValidateInputDecorator class, and parse is an alias of P
 
 from inspect import signature, Parameter
 from .validators import Validator
-from .processors import ValidateInput, ParseInput
+from .processors import ValidateInput, ParseInput, identity
 from .wrappers import FuncWrapper
 
 
@@ -148,8 +148,24 @@ class ValidateInputDecorator(Decorator):
 
     empty_arg = object
 
+    def __init__(self, *args, sample=None, executor=None, **kwargs):
+        '''
+        Initializes this instance.
+        :param args: Validators for the positional arguments.
+        :param sample: If indicated, only this fraction of the calls are validated (see ValidateInput)
+        :param executor: If indicated, expensive validators of different arguments run in parallel with this
+        executor (see ValidateInput)
+        The names "sample" and "executor" are reserved and cannot be used to set the validator of an argument.
+        :param kwargs: Validators for the keyword arguments.
+        '''
+        super().__init__(*args, **kwargs)
+        self.sample = sample
+        self.executor = executor
+
     def create_processor(self, *args):
-        return ValidateInput(map(Validator.from_spec, args))
+        # Composed validators are simplified once here
+        return ValidateInput([Validator.from_spec(arg).optimize() for arg in args], sample=self.sample,
+                             executor=self.executor)
 
 
 class ParseInputDecorator(Decorator):
@@ -159,7 +175,7 @@ class ParseInputDecorator(Decorator):
     empty_arg = None
 
     def create_processor(self, *args):
-        return ParseInput([arg if arg is not None else lambda arg: arg for arg in args])
+        return ParseInput([arg if arg is not None else identity for arg in args])
 
 
 
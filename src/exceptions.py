@@ -25,6 +25,7 @@ class ParsingError(Exception):
         self._param = param
         self._description = description if isinstance(description, str) else ''
         self._level = None
+        self._row = None
 
 
     @property
@@ -40,12 +41,38 @@ class ParsingError(Exception):
             raise ValueError()
         self._level = x
 
+    @property
+    def row(self):
+        '''
+        Index of the row of arguments which was being processed when this error was raised (only when calling a
+        function over many rows of arguments with FuncWrapper.map() or FuncWrapper.starmap()) or None
+        '''
+        return self._row
+
+    @row.setter
+    def row(self, x):
+        if not isinstance(x, int) and x is not None:
+            raise TypeError()
+
+        if isinstance(x, int) and x < 0:
+            raise ValueError()
+        self._row = x
+
+    @property
+    def position(self):
+        '''
+        Returns a string indicating the position of the argument (and the row if it is set)
+        '''
+        if self._row is None:
+            return 'position {}'.format(self._param+1)
+        return 'position {} of row {}'.format(self._param+1, self._row+1)
+
 
     def __str__(self):
         param, description, level = self._param, self._description, self._level
 
-        msg = 'Error parsing argument at position {}{}'.format(
-            param+1,
+        msg = 'Error parsing argument at {}{}'.format(
+            self.position,
             ': {}'.format(description) if description else '')
         if level is not None:
             msg += ' (at level {})'.format(level+1)
@@ -58,8 +85,8 @@ class ValidationError(ParsingError):
     def __str__(self):
         param, description, level = self._param, self._description, self._level
 
-        msg = 'Invalid argument at position {}{}'.format(
-            param+1,
+        msg = 'Invalid argument at {}{}'.format(
+            self.position,
             ': {}'.format(description) if description else '')
         if level is not None:
             msg += ' (at level {})'.format(level+1)
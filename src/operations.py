@@ -1,5 +1,12 @@
 
 from re import sub, search
+from keyword import iskeyword
+from inspect import isclass
+from types import FunctionType, BuiltinFunctionType
+from numbers import Number
+from functools import lru_cache
+from copy import copy
+from weakref import WeakValueDictionary
 import operator
 
 
@@ -8,6 +15,9 @@ class Operation:
     Objects of this instance represents some kind of transformation for any given input value.
     x -> f(x)
     '''
+    # Its True if this operation is in the table of interned operations (see intern())
+    _interned = False
+
     def __init__(self, expr):
         '''
         Initializes this instance.
@@ -31,6 +41,139 @@ class Operation:
         '''
         raise NotImplementedError()
 
+    def evaluate(self, x):
+        '''
+        Evaluates this operation for the given input x and returns the result. Its the same as calling it, except
+        for operations that access attributes: Calling them builds an operation that calls the attribute
+        (e.g. arg.startswith('a'))
+        '''
+        return self(x)
+
+    def __getattr__(self, name):
+        '''
+        Accessing an attribute which is not defined builds an operation which is defined like f(x) = g(x).name
+        e.g: arg.shape[0] == 3, arg.startswith('a')
+        Attributes whose names are the same as the ones of the methods of this class (format, compile, ...) must
+        be accessed with getattr_()
+        '''
+        # Special and private attributes are never operations (copy, pickle and others look them up)
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return AttributeOperation(self, name).intern()
+
+    def compile(self):
+        '''
+        Compiles this operation into a single Python function that evaluates the whole expression tree at once
+        (without calling recursively the operations and operators of the tree).
+        Functions are generated once for each expression structure: Expressions that only differ on their constants
+        share the same code. Also, each operation is compiled only once (interned operations share the compiled
+        function)
+        :return: Returns a function that accepts the input value x and returns the result of this operation.
+        '''
+        compiled = self.__dict__.get('_compiled')
+        if compiled is None:
+            compiled = self._compiled = Compiler().compile(self)
+        return compiled
+
+    def optimize(self):
+        '''
+        Returns an equivalent operation which is faster to evaluate: Subexpressions with only constants are folded,
+        identity operations (x + 0, x - 0, x * 1, x ** 1, -(-x), ~(~x)) are removed and comparisons are normalized
+        so that constants are always on the right side (1 < x turns into x > 1)
+        Identities are only removed when its known that the operand is a number (see is_numeric()): e.g. x + 0 raises an
+        exception if x is a string but x doesn't, so len(x) + 0 is simplified but x + 0 is not. ~(~x) is only simplified
+        for integers.
+        The returned operation is stringified like this one (so error messages remain the same)
+        '''
+        result = self.simplify()
+        if result is not self:
+            result = copy(result)
+            result.expr = self.expr
+            result.__dict__.pop('_interned', None)
+            result.__dict__.pop('_compiled', None)
+        return result
+
+    def simplify(self):
+        '''
+        Returns a simplified version of this operation (see optimize()) or itself if it cannot be simplified.
+        Subclasses may override this method.
+        '''
+        return self
+
+    def source(self, compiler):
+        '''
+        Returns the Python source code of an expression that evaluates this operation for the input value x.
+        Subclasses may override this method.
+        :param compiler: The instance of Compiler generating the code. The code of the operands must be generated with
+        compiler.source() and the objects referenced by the code must be bound with compiler.bind()
+        By default, the code just calls this operation.
+        '''
+        return '{}(x)'.format(compiler.bind(self))
+
+    def operands(self):
+        '''
+        Returns the operations whose results are the operands of this operation (used to find common subexpressions)
+        Subclasses may override this method.
+        '''
+        return ()
+
+    def elementwise(self):
+        '''
+        Returns True if this operation evaluated for a numpy array returns the array of the results for each of its
+        elements (e.g. (x >= 0) & (x <= 1)), so that it can be evaluated separately for chunks of the array.
+        Subclasses may override this method. By default returns False.
+        '''
+        return False
+
+    def key(self):
+        '''
+        Returns an object that identifies the structure of this operation: Two operations with equal keys always
+        evaluate to the same result for the same input value. It can be used to hash operations (they are not hashable
+        because == builds a new operation)
+        Subclasses may override this method. By default, an operation is only equal to itself.
+        '''
+        return 'operation', id(self)
+
+    def equals(self, other):
+        '''
+        Returns True if the given object is an operation with the same structure as this one (see key())
+        '''
+        return self is other or (isinstance(other, Operation) and self.key() == other.key())
+
+    def intern(self):
+        '''
+        Returns the operation with the same structure as this one in the table of interned operations. If there
+        is none, this operation is added to it. The table only keeps weak references to its operations.
+        Operations built with the operators (arg + 1, arg > 0, ...) are interned automatically, so identical
+        expressions built in different places share the same nodes (and the same compiled functions)
+        '''
+        if self._interned:
+            return self
+        key = self.intern_key()
+        if key is None:
+            return self
+        operation = interned.get(key)
+        if operation is None:
+            self._interned = True
+            interned[key] = operation = self
+        return operation
+
+    def intern_key(self):
+        '''
+        Returns the key of this operation in the table of interned operations or None if it cannot be interned.
+        Unlike key(), it can assume that the operands are interned if the operation is (operands are compared by
+        identity). It returns None otherwise.
+        Subclasses may override this method.
+        '''
+        return 'operation', id(self)
+
+    def __getstate__(self):
+        # Compiled functions cannot be pickled and unpickled operations are not interned
+        state = self.__dict__.copy()
+        state.pop('_compiled', None)
+        state.pop('_interned', None)
+        return state
+
     # Stringify
 
     def format(self, x):
@@ -39,10 +182,9 @@ class Operation:
         :param x:
         :return:
         '''
-        s = sub('^x(.*)$', '{}\\1', self.expr)
-        s = sub('^(.*)x$', '\\1{}', s)
-        s = sub('([^\'\"])x([^\'\"])', '\\1{}\\2', s)
-        return s.replace('{}', str(x) if not isinstance(x, str) else "'{}'".format(x))
+        value = str(x) if not isinstance(x, str) else "'{}'".format(x)
+        # Replace the symbol x (but not names or attributes containing it, like max(x) or x.x, neither quoted x)
+        return sub('(?<![\\w.\'\"])x(?![\\w\'\"])', lambda match: value, self.expr)
 
     def __str__(self):
         return self.expr
@@ -54,86 +196,86 @@ class Operation:
     # Arithmetic operations
 
     def __add__(self, other):
-        return BinaryOperation(Operator.__add__, self, other)
+        return BinaryOperation(Operator.__add__, self, other).intern()
 
     def __sub__(self, other):
-        return BinaryOperation(Operator.__sub__, self, other)
+        return BinaryOperation(Operator.__sub__, self, other).intern()
 
     def __floordiv__(self, other):
-        return BinaryOperation(Operator.__floordiv__, self, other)
+        return BinaryOperation(Operator.__floordiv__, self, other).intern()
 
     def __mod__(self, other):
-        return BinaryOperation(Operator.__mod__, self, other)
+        return BinaryOperation(Operator.__mod__, self, other).intern()
 
     def __mul__(self, other):
-        return BinaryOperation(Operator.__mul__, self, other)
+        return BinaryOperation(Operator.__mul__, self, other).intern()
 
     def __matmul__(self, other):
-        return BinaryOperation(Operator.__matmul__, self, other)
+        return BinaryOperation(Operator.__matmul__, self, other).intern()
 
     def __pow__(self, power):
-        return BinaryOperation(Operator.__pow__, self, power)
+        return BinaryOperation(Operator.__pow__, self, power).intern()
 
     def __truediv__(self, other):
-        return BinaryOperation(Operator.__truediv__, self, other)
+        return BinaryOperation(Operator.__truediv__, self, other).intern()
 
     def __neg__(self):
-        return UnaryOperation(Operator.__neg__, self)
+        return UnaryOperation(Operator.__neg__, self).intern()
 
     def __pos__(self):
-        return UnaryOperation(Operator.__pos__, self)
+        return UnaryOperation(Operator.__pos__, self).intern()
 
     def __abs__(self):
-        return UnaryOperation(Operator.__abs__, self)
+        return UnaryOperation(Operator.__abs__, self).intern()
 
 
 
     # Bitwise operations
 
     def __and__(self, other):
-        return BinaryOperation(Operator.__and__, self, other)
+        return BinaryOperation(Operator.__and__, self, other).intern()
 
     def __or__(self, other):
-        return BinaryOperation(Operator.__or__, self, other)
+        return BinaryOperation(Operator.__or__, self, other).intern()
 
     def __xor__(self, other):
-        return BinaryOperation(Operator.__xor__, self, other)
+        return BinaryOperation(Operator.__xor__, self, other).intern()
 
     def __lshift__(self, other):
-        return BinaryOperation(Operator.__lshift__, self, other)
+        return BinaryOperation(Operator.__lshift__, self, other).intern()
 
     def __rshift__(self, other):
-        return BinaryOperation(Operator.__rshift__, self, other)
+        return BinaryOperation(Operator.__rshift__, self, other).intern()
 
     def __invert__(self):
-        return UnaryOperation(Operator.__invert__, self)
+        return UnaryOperation(Operator.__invert__, self).intern()
 
 
     # Container operations
 
     def __getitem__(self, item):
-        return BinaryOperation(Operator.__getitem__, self, item)
+        return BinaryOperation(Operator.__getitem__, self, item).intern()
 
 
     # Comparision operators
 
     def __lt__(self, other):
-        return BinaryOperation(Operator.__lt__, self, other)
+        return BinaryOperation(Operator.__lt__, self, other).intern()
 
     def __le__(self, other):
-        return BinaryOperation(Operator.__le__, self, other)
+        return BinaryOperation(Operator.__le__, self, other).intern()
 
     def __eq__(self, other):
-        return BinaryOperation(Operator.__eq__, self, other)
+        return BinaryOperation(Operator.__eq__, self, other).intern()
 
     def __ne__(self, other):
-        return BinaryOperation(Operator.__ne__, self, other)
+        return BinaryOperation(Operator.__ne__, self, other).intern()
 
     def __ge__(self, other):
-        return BinaryOperation(Operator.__ge__, self, other)
+        return BinaryOperation(Operator.__ge__, self, other).intern()
 
     def __gt__(self, other):
-        return BinaryOperation(Operator.__gt__, self, other)
+        return BinaryOperation(Operator.__gt__, self, other).intern()
 
 
 class Operator:
@@ -145,7 +287,7 @@ class Operator:
     an example of operator could be the binary sum operation:
     f(a, b) = a + b
     '''
-    def __init__(self, expr, func):
+    def __init__(self, expr, func, code=None):
         '''
         Initializes this instance.
         :param expr: It must be a string used when converting this instance to string.
@@ -157,14 +299,23 @@ class Operator:
         the operation.
         For example, when defining the binary sum operator f(a, b) = a + b,
         func could be set as "lambda a, b: a + b"
+
+        :param code: An optional string with the Python code equivalent to func(...) (used when compiling operations).
+        "{}" substrings will be replaced by the code of the input values.
+        e.g:
+        "({} + {})" for the binary sum operator.
+        If not specified, compiled operations call func.
         '''
         if not isinstance(expr, str):
             raise TypeError()
         if not callable(func):
             raise TypeError()
+        if code is not None and not isinstance(code, str):
+            raise TypeError()
 
         self.func = func
         self.expr = expr
+        self.code = code
 
     def __call__(self, *args):
         '''
@@ -177,31 +328,51 @@ class Operator:
         '''
         Returns a formatted string version of this instance for the given input values.
         '''
-        args = [arg.expr if not isinstance(arg, BinaryOperation) else '({})'.format(arg.expr) for arg in args]
+        args = [arg.expr if not isinstance(arg, (BinaryOperation, LogicalOperation)) else '({})'.format(arg.expr)
+                for arg in args]
         return self.expr.format(*args)
 
+    def source(self, compiler, *args):
+        '''
+        Returns the Python source code that evaluates this operator for the given input values.
+        :param compiler: The instance of Compiler generating the code (see Operation.source())
+        :param args: The source code of the input values.
+        '''
+        if self.code is not None:
+            return self.code.format(*args)
+        return '{}({})'.format(compiler.bind(self.func), ', '.join(args))
+
     def __str__(self):
         return self.expr
 
     def __repr__(self):
         return str(self)
 
+    def __reduce_ex__(self, protocol):
+        # Predefined operators are pickled by reference (operations are simplified comparing them by identity)
+        name = getattr(self, 'name', None)
+        if name is not None and getattr(Operator, name, None) is self:
+            return getattr, (Operator, name)
+        return super().__reduce_ex__(protocol)
+
 class BinaryOperator(Operator):
     '''
     Defines any operator with two input operands.
     '''
-    def __init__(self, expr, func):
+    def __init__(self, expr, func, code=None):
         if not isinstance(expr, str):
             raise TypeError()
-        super().__init__(expr if search('{}.*{}', expr) else ' '.join(('{}', expr, '{}')), func)
+        super().__init__(expr if search('{}.*{}', expr) else ' '.join(('{}', expr, '{}')), func, code)
 
 
 class UnaryOperator(Operator):
     '''
     Defines any operator with only one input operand
     '''
-    def __init__(self, expr, func):
-        super().__init__(expr if search('{}', expr) else expr+'{}', func)
+    def __init__(self, expr, func, code=None):
+        if not isinstance(expr, str):
+            raise TypeError()
+        super().__init__(expr if search('{}', expr) else expr+'{}', func, code)
 
 
 
@@ -215,18 +386,47 @@ class Identity(Operation):
     def __call__(self, x):
         return x
 
+    def source(self, compiler):
+        return 'x'
+
+    def elementwise(self):
+        return True
+
+    def key(self):
+        return 'x',
+
+    def intern_key(self):
+        return 'x',
+
 
 class Constant(Operation):
     '''
     Special transformation which is defined like: f(x) = k
     '''
     def __init__(self, k):
-        super().__init__(expr=str(k) if not isinstance(k, str) else "'{}'".format(k))
-        self.k = k
+        super().__init__(expr=format_value(k))
+        self._k = k
 
     def __call__(self, x):
-        return self.k
+        return self._k
+
+    def source(self, compiler):
+        return compiler.bind(self._k)
+
+    def elementwise(self):
+        return isinstance(self._k, (Number, str))
 
+    def key(self):
+        try:
+            hash(self._k)
+        except TypeError:
+            return 'constant', id(self._k)
+        # Equal constants can be stringified differently (e.g. 0.0 and -0.0)
+        return 'constant', type(self._k), self._k, self.expr
+
+    def intern_key(self):
+        key = self.key()
+        return key if len(key) > 2 else None
 
 
 class BinaryOperation(Operation):
@@ -248,19 +448,61 @@ class BinaryOperation(Operation):
             raise TypeError()
 
         if not isinstance(g, Operation):
-            g = Constant(g)
+            g = Constant(g).intern()
 
         if not isinstance(h, Operation):
-            h = Constant(h)
+            h = Constant(h).intern()
 
         super().__init__(
             expr=op.format(g, h)
         )
-        self.op = op
-        self.g, self.h = g, h
+        self._op = op
+        self._g, self._h = g, h
 
     def __call__(self, x):
-        return self.op(self.g(x), self.h(x))
+        return self._op(self._g.evaluate(x), self._h.evaluate(x))
+
+    def source(self, compiler):
+        return self._op.source(compiler, compiler.source(self._g), compiler.source(self._h))
+
+    def operands(self):
+        return self._g, self._h
+
+    def elementwise(self):
+        return self._op is not Operator.__getitem__ and self._op is not Operator.__matmul__ and \
+            self._g.elementwise() and self._h.elementwise()
+
+    def key(self):
+        return 'binary', id(self._op), self._g.key(), self._h.key()
+
+    def intern_key(self):
+        if not (self._g._interned and self._h._interned):
+            return None
+        return 'binary', id(self._op), id(self._g), id(self._h)
+
+    def simplify(self):
+        op, g, h = self._op, self._g.simplify(), self._h.simplify()
+        if isinstance(g, Constant) and isinstance(h, Constant):
+            try:
+                return Constant(op(g._k, h._k))
+            except Exception:
+                pass
+
+        # Identities only hold for numbers (e.g. 'a' + 0 raises an exception)
+        if is_numeric(g) and ((op is Operator.__add__ or op is Operator.__sub__) and is_number(h, 0) or
+                              (op is Operator.__mul__ or op is Operator.__pow__) and is_number(h, 1)):
+            return g
+        if is_numeric(h) and (op is Operator.__add__ and is_number(g, 0) or op is Operator.__mul__ and is_number(g, 1)):
+            return h
+
+        if isinstance(g, Constant) and not isinstance(h, Constant):
+            for a, b in mirrored_comparisons:
+                if op is a:
+                    return BinaryOperation(b, h, g)
+
+        if g is self._g and h is self._h:
+            return self
+        return BinaryOperation(op, g, h)
 
 
 
@@ -282,53 +524,543 @@ class UnaryOperation(Operation):
         if not isinstance(op, UnaryOperator):
             raise TypeError()
         if not isinstance(g, Operation):
-            g = Constant(g)
+            g = Constant(g).intern()
 
         super().__init__(
             expr=op.format(g)
         )
-        self.op = op
-        self.g = g
+        self._op = op
+        self._g = g
+
+    def __call__(self, x):
+        return self._op(self._g.evaluate(x))
+
+    def source(self, compiler):
+        return self._op.source(compiler, compiler.source(self._g))
+
+    def operands(self):
+        return self._g,
+
+    def elementwise(self):
+        return self._op is not Operator.__not__ and self._g.elementwise()
+
+    def key(self):
+        return 'unary', id(self._op), self._g.key()
+
+    def intern_key(self):
+        if not self._g._interned:
+            return None
+        return 'unary', id(self._op), id(self._g)
+
+    def simplify(self):
+        op, g = self._op, self._g.simplify()
+        if isinstance(g, Constant):
+            try:
+                return Constant(op(g._k))
+            except Exception:
+                pass
+        # ~ is only defined for integers (~(~x) raises an exception if x is a float)
+        if isinstance(g, UnaryOperation) and g._op is op and \
+                (op is Operator.__neg__ and is_numeric(g._g) or op is Operator.__invert__ and is_numeric(g._g, integral=True)):
+            return g._g
+
+        if g is self._g:
+            return self
+        return UnaryOperation(op, g)
+
+
+class LogicalOperation(Operation):
+    '''
+    Operation which is defined like f(x) = g1(x) and g2(x) and ... and gn(x) (or the same with "or" instead of "and")
+    Where g1, g2, ..., gn are also operations.
+    Like the Python operators and/or, operands are evaluated from left to right only until one of them decides the
+    result, which is the value of the last operand evaluated.
+    '''
+    def __init__(self, conjunction, items):
+        '''
+        Initializes this instance.
+        :param conjunction: Must be "and" or "or"
+        :param items: The operands (at least 1). Values that are not instances of Operation are used as constants.
+        '''
+        if conjunction not in ('and', 'or'):
+            raise ValueError()
+        items = tuple(item if isinstance(item, Operation) else Constant(item).intern() for item in items)
+        if len(items) == 0:
+            raise ValueError()
+
+        super().__init__(
+            expr=' {} '.format(conjunction).join(
+                item.expr if not isinstance(item, (BinaryOperation, LogicalOperation)) else '({})'.format(item.expr)
+                for item in items)
+        )
+        self._conjunction = conjunction
+        self._items = items
+
+    def __call__(self, x):
+        decisive = self._conjunction == 'or'
+        for item in self._items:
+            result = item.evaluate(x)
+            if bool(result) == decisive:
+                break
+        return result
+
+    def source(self, compiler):
+        # Only the first operand is always evaluated
+        return '({})'.format(' {} '.format(self._conjunction).join(
+            [compiler.source(self._items[0])] + [compiler.source(item, conditional=True) for item in self._items[1:]]))
+
+    def simplify(self):
+        items = []
+        for item in self._items:
+            item = item.simplify()
+            if isinstance(item, LogicalOperation) and item._conjunction == self._conjunction:
+                items.extend(item._items)
+            else:
+                items.append(item)
+        if len(items) == 1:
+            return items[0]
+        if all(a is b for a, b in zip(items, self._items)) and len(items) == len(self._items):
+            return self
+        return LogicalOperation(self._conjunction, items)
+
+    def operands(self):
+        return self._items
+
+    def key(self):
+        return 'logical', self._conjunction, tuple(item.key() for item in self._items)
+
+    def intern_key(self):
+        if not all(item._interned for item in self._items):
+            return None
+        return ('logical', self._conjunction) + tuple(map(id, self._items))
+
+
+# Table of interned operations (see Operation.intern())
+interned = WeakValueDictionary()
+
+
+class AttributeOperation(Operation):
+    '''
+    Operation which is defined like f(x) = g(x).name
+    Where g is other operation.
+    Calling instances of this class builds an operation that calls the attribute: arg.startswith('a') is defined like
+    f(x) = x.startswith('a')
+    Use evaluate() to evaluate them.
+    '''
+    def __init__(self, g, name):
+        '''
+        Initializes this instance.
+        :param g: Instance of class Operation
+        :param name: Name of the attribute (a valid identifier)
+        '''
+        if not isinstance(g, Operation):
+            g = Constant(g).intern()
+        if not isinstance(name, str):
+            raise TypeError()
+        if not name.isidentifier() or iskeyword(name):
+            raise ValueError()
+
+        super().__init__(expr='{}.{}'.format(format_operand(g), name))
+        self._g = g
+        self._name = name
+
+    def __call__(self, *args, **kwargs):
+        return CallOperation(self, args, kwargs).intern()
+
+    def evaluate(self, x):
+        return getattr(self._g.evaluate(x), self._name)
+
+    def source(self, compiler):
+        return '{}.{}'.format(compiler.source(self._g), self._name)
+
+    def simplify(self):
+        g = self._g.simplify()
+        if g is self._g:
+            return self
+        return AttributeOperation(g, self._name)
+
+    def operands(self):
+        return self._g,
+
+    def elementwise(self):
+        return self._name in ('real', 'imag') and self._g.elementwise()
+
+    def key(self):
+        return 'attribute', self._g.key(), self._name
+
+    def intern_key(self):
+        if not self._g._interned:
+            return None
+        return 'attribute', id(self._g), self._name
+
+
+class CallOperation(Operation):
+    '''
+    Operation which is defined like f(x) = func(g1(x), g2(x), ..., name1=h1(x), name2=h2(x), ...)
+    Where g1, g2, ..., h1, h2, ... are also operations and func is a callable object or an operation (to call
+    methods of the input values: func(x) = x.method)
+    '''
+    def __init__(self, func, args=(), kwargs=None):
+        '''
+        Initializes this instance.
+        :param func: The function to call. Must be a callable object or an instance of the class Operation.
+        :param args: The positional arguments. Values that are not operations are used as constants.
+        :param kwargs: A dictionary with the keyword arguments. Values that are not operations are used as constants.
+        '''
+        if not isinstance(func, Operation) and not callable(func):
+            raise TypeError()
+        if kwargs is None:
+            kwargs = {}
+        if not all(isinstance(name, str) and name.isidentifier() and not iskeyword(name) for name in kwargs):
+            raise ValueError()
+        args = tuple(arg if isinstance(arg, Operation) else Constant(arg).intern() for arg in args)
+        kwargs = tuple((name, value if isinstance(value, Operation) else Constant(value).intern())
+                       for name, value in kwargs.items())
+
+        super().__init__(expr='{}({})'.format(
+            format_operand(func) if isinstance(func, Operation) else
+            getattr(func, '__qualname__', None) or getattr(func, '__name__', None) or str(func),
+            ', '.join([arg.expr for arg in args] + ['{}={}'.format(name, value.expr) for name, value in kwargs])
+        ))
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
 
     def __call__(self, x):
-        return self.op(self.g(x))
+        func = self._func.evaluate(x) if isinstance(self._func, Operation) else self._func
+        return func(*[arg.evaluate(x) for arg in self._args],
+                    **{name: value.evaluate(x) for name, value in self._kwargs})
+
+    def source(self, compiler):
+        func = compiler.source(self._func) if isinstance(self._func, Operation) else compiler.bind(self._func)
+        return '{}({})'.format(func, ', '.join(
+            [compiler.source(arg) for arg in self._args] +
+            ['{}={}'.format(name, compiler.source(value)) for name, value in self._kwargs]))
+
+    def simplify(self):
+        # Calls are never folded (functions may not return always the same result)
+        func = self._func.simplify() if isinstance(self._func, Operation) else self._func
+        args = tuple(arg.simplify() for arg in self._args)
+        kwargs = tuple((name, value.simplify()) for name, value in self._kwargs)
+        if func is self._func and all(a is b for a, b in zip(args, self._args)) and \
+                all(a[1] is b[1] for a, b in zip(kwargs, self._kwargs)):
+            return self
+        return CallOperation(func, args, dict(kwargs))
+
+    def operands(self):
+        return ((self._func,) if isinstance(self._func, Operation) else ()) + self._args + \
+            tuple(value for name, value in self._kwargs)
+
+    def elementwise(self):
+        # Builtin abs() and numpy universal functions (np.sqrt, np.isfinite, ...)
+        return (self._func is abs or type(self._func).__name__ == 'ufunc') and \
+            all(operand.elementwise() for operand in self.operands())
+
+    def key(self):
+        return ('call', self._func.key() if isinstance(self._func, Operation) else id(self._func),
+                tuple(arg.key() for arg in self._args), tuple((name, value.key()) for name, value in self._kwargs))
+
+    def intern_key(self):
+        if not all(operand._interned for operand in self.operands()):
+            return None
+        return ('call', id(self._func), tuple(map(id, self._args)),
+                tuple((name, id(value)) for name, value in self._kwargs))
+
+
+def format_value(k):
+    '''
+    Returns a string representation of the given constant value used to stringify operations.
+    '''
+    if isinstance(k, str):
+        return "'{}'".format(k)
+    if isclass(k) or isinstance(k, (FunctionType, BuiltinFunctionType)):
+        return k.__qualname__
+    if type(k) is tuple and any(map(isclass, k)):
+        return '({})'.format(', '.join(map(format_value, k)) + (',' if len(k) == 1 else ''))
+    return str(k)
+
+
+def format_operand(operation):
+    '''
+    Returns a string representation of the given operation used to stringify other operations that have it as
+    operand (with parenthesis if needed)
+    '''
+    if isinstance(operation, (BinaryOperation, UnaryOperation, LogicalOperation)):
+        return '({})'.format(operation.expr)
+    return operation.expr
+
+
+def is_number(operation, value):
+    '''
+    Returns True if the given operation is a constant number (int or float) equal to the value indicated.
+    '''
+    return isinstance(operation, Constant) and type(operation._k) in (int, float) and operation._k == value
+
+
+def is_numeric(operation, integral=False):
+    '''
+    Returns True if its known that the given operation always evaluates to an int or float value (arithmetic
+    identities like x + 0 = x are only applied to such operations)
+    :param integral: If True, returns True only if the operation always evaluates to an int value.
+    '''
+    if isinstance(operation, Constant):
+        return type(operation._k) in ((int,) if integral else (int, float))
+    if isinstance(operation, CallOperation):
+        return operation._func is len
+    # Arithmetic operations with numbers (powers are excluded: they can be complex numbers, and divisions are
+    # excluded for integers: they evaluate to floats)
+    if isinstance(operation, BinaryOperation):
+        operators = (Operator.__add__, Operator.__sub__, Operator.__mul__, Operator.__floordiv__, Operator.__mod__) + \
+            (() if integral else (Operator.__truediv__,))
+        return any(operation._op is op for op in operators) and \
+            is_numeric(operation._g, integral) and is_numeric(operation._h, integral)
+    if isinstance(operation, UnaryOperation):
+        return (operation._op is Operator.__neg__ or operation._op is Operator.__pos__) and \
+            is_numeric(operation._g, integral)
+    return False
+
+
+class Compiler:
+    '''
+    Generates the code of compiled operations. Subexpressions that appear more than once in the operations compiled
+    together are evaluated only once: the first time, their result is assigned to a variable (t0, t1, ...) which is
+    read by the rest of them.
+    '''
+    def __init__(self):
+        # Objects referenced by the code (named k0, k1, ...)
+        self.values = []
+        # Number of occurrences of each subexpression and names of the variables holding the repeated ones
+        self.counts = {}
+        self.variables = {}
+        # Greater than zero while generating code that may not be evaluated (operands of "and" / "or")
+        self.conditional = 0
+
+    def bind(self, obj):
+        '''
+        Adds the given object to the objects referenced by the code and returns the name used to reference it.
+        '''
+        self.values.append(obj)
+        return 'k{}'.format(len(self.values)-1)
+
+    def count(self, operation):
+        '''
+        Counts the subexpressions of the given operation. All the operations must be counted before generating any
+        code.
+        '''
+        if isinstance(operation, (Identity, Constant)):
+            return
+        key = operation.key()
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if self.counts[key] == 1:
+            for operand in operation.operands():
+                self.count(operand)
+
+    def source(self, operation, conditional=False):
+        '''
+        Returns the code of an expression that evaluates the given operation for the input value x.
+        The code generated for the operations counted must be evaluated in the same order in which it is generated.
+        :param conditional: Must be True if the code of the operation may not be evaluated (then, the results of
+        its subexpressions are not assigned to variables since they could be read when they are not defined)
+        '''
+        if conditional:
+            self.conditional += 1
+            try:
+                return self.source(operation)
+            finally:
+                self.conditional -= 1
+
+        if isinstance(operation, (Identity, Constant)) or self.counts.get(operation.key(), 0) < 2:
+            return operation.source(self)
+        key = operation.key()
+        if key in self.variables:
+            return self.variables[key]
+        if self.conditional > 0:
+            return operation.source(self)
+        name = 't{}'.format(len(self.variables))
+        code = '({} := {})'.format(name, operation.source(self))
+        self.variables[key] = name
+        return code
+
+    def build(self, source):
+        '''
+        Compiles a function that evaluates the given expression for the input value x (the code must have been
+        generated by this instance)
+        '''
+        return compile_source(source, len(self.values))(*self.values)
+
+    def compile(self, operation):
+        '''
+        Compiles the given operation (see Operation.compile())
+        '''
+        operation = operation.optimize()
+        self.count(operation)
+        return self.build(self.source(operation))
+
+
+@lru_cache(maxsize=1024)
+def compile_source(source, count):
+    '''
+    Compiles the source code of an operation.
+    :param source: The code of an expression that evaluates the operation for the input value x
+    :param count: Number of objects referenced by the code (k0, k1, ...)
+    :return: Returns a function that accepts the objects referenced by the code and returns the compiled operation
+    (they are bound as closure variables)
+    '''
+    params = ', '.join('k{}'.format(index) for index in range(0, count))
+    code = 'def factory({}):\n    def operation(x):\n        return {}\n    return operation\n'.format(params, source)
+    namespace = {}
+    exec(compile(code, '<operation>', 'exec'), namespace)
+    return namespace['factory']
 
 
 # Arithmetic operations
 
-Operator.__add__ = BinaryOperator('+', operator.__add__)
-Operator.__sub__ = BinaryOperator('-', operator.__sub__)
-Operator.__floordiv__ = BinaryOperator('//', operator.__floordiv__)
-Operator.__mod__ = BinaryOperator('%', operator.__mod__)
-Operator.__mul__ = BinaryOperator('*', operator.__mul__)
-Operator.__matmul__ = BinaryOperator('@', operator.__matmul__)
-Operator.__pow__ = BinaryOperator('**', operator.__pow__)
-Operator.__truediv__ = BinaryOperator('/', operator.__truediv__)
-Operator.__neg__ = UnaryOperator('-', operator.__neg__)
-Operator.__pos__ = UnaryOperator('+', operator.__pos__)
-Operator.__abs__ = UnaryOperator('|{}|', operator.__abs__)
+Operator.__add__ = BinaryOperator('+', operator.__add__, '({} + {})')
+Operator.__sub__ = BinaryOperator('-', operator.__sub__, '({} - {})')
+Operator.__floordiv__ = BinaryOperator('//', operator.__floordiv__, '({} // {})')
+Operator.__mod__ = BinaryOperator('%', operator.__mod__, '({} % {})')
+Operator.__mul__ = BinaryOperator('*', operator.__mul__, '({} * {})')
+Operator.__matmul__ = BinaryOperator('@', operator.__matmul__, '({} @ {})')
+Operator.__pow__ = BinaryOperator('**', operator.__pow__, '({} ** {})')
+Operator.__truediv__ = BinaryOperator('/', operator.__truediv__, '({} / {})')
+Operator.__neg__ = UnaryOperator('-', operator.__neg__, '(-{})')
+Operator.__pos__ = UnaryOperator('+', operator.__pos__, '(+{})')
+Operator.__abs__ = UnaryOperator('|{}|', operator.__abs__, 'abs({})')
 
 
 # Bitwise operations
-Operator.__and__ = BinaryOperator('&', operator.__and__)
-Operator.__or__ = BinaryOperator('|', operator.__or__)
-Operator.__xor__ = BinaryOperator('^', operator.__xor__)
-Operator.__lshift__ = BinaryOperator('<<', operator.__lshift__)
-Operator.__rshift__ = BinaryOperator('>>', operator.__rshift__)
-Operator.__invert__ = UnaryOperator('~', operator.__invert__)
+Operator.__and__ = BinaryOperator('&', operator.__and__, '({} & {})')
+Operator.__or__ = BinaryOperator('|', operator.__or__, '({} | {})')
+Operator.__xor__ = BinaryOperator('^', operator.__xor__, '({} ^ {})')
+Operator.__lshift__ = BinaryOperator('<<', operator.__lshift__, '({} << {})')
+Operator.__rshift__ = BinaryOperator('>>', operator.__rshift__, '({} >> {})')
+Operator.__invert__ = UnaryOperator('~', operator.__invert__, '(~{})')
+
+# Logical operations
+Operator.__not__ = UnaryOperator('not ', operator.__not__, '(not {})')
 
 # Container operations
-Operator.__getitem__ = BinaryOperator('{}[{}]', operator.__getitem__)
+Operator.__getitem__ = BinaryOperator('{}[{}]', operator.__getitem__, '{}[{}]')
 
 # Comparision validators
-Operator.__lt__ = BinaryOperator('<', operator.__lt__)
-Operator.__le__ = BinaryOperator('<=', operator.__le__)
-Operator.__eq__ = BinaryOperator('==', operator.__eq__)
-Operator.__ne__ = BinaryOperator('!=', operator.__ne__)
-Operator.__ge__ = BinaryOperator('>=', operator.__ge__)
-Operator.__gt__ = BinaryOperator('>', operator.__gt__)
+Operator.__lt__ = BinaryOperator('<', operator.__lt__, '({} < {})')
+Operator.__le__ = BinaryOperator('<=', operator.__le__, '({} <= {})')
+Operator.__eq__ = BinaryOperator('==', operator.__eq__, '({} == {})')
+Operator.__ne__ = BinaryOperator('!=', operator.__ne__, '({} != {})')
+Operator.__ge__ = BinaryOperator('>=', operator.__ge__, '({} >= {})')
+Operator.__gt__ = BinaryOperator('>', operator.__gt__, '({} > {})')
+
+# Names of the predefined operators
+for name, value in tuple(vars(Operator).items()):
+    if isinstance(value, Operator):
+        value.name = name
+del name, value
+
+# Pairs of operators such that x op1 y is equivalent to y op2 x
+mirrored_comparisons = (
+    (Operator.__lt__, Operator.__gt__), (Operator.__gt__, Operator.__lt__),
+    (Operator.__le__, Operator.__ge__), (Operator.__ge__, Operator.__le__),
+    (Operator.__eq__, Operator.__eq__), (Operator.__ne__, Operator.__ne__)
+)
+
+
+# Logical operations (unlike & and |, they only evaluate the operands needed to decide the result)
+
+def all_of(*operations):
+    '''
+    Returns an operation which is defined like f(x) = g1(x) and g2(x) and ... and gn(x)
+    e.g: all_of(arg > 0, arg < 10)
+    '''
+    return LogicalOperation('and', operations).intern()
+
+
+def any_of(*operations):
+    '''
+    Returns an operation which is defined like f(x) = g1(x) or g2(x) or ... or gn(x)
+    e.g: any_of(arg < 0, arg > 10)
+    '''
+    return LogicalOperation('or', operations).intern()
+
+
+def not_(operation):
+    '''
+    Returns an operation which is defined like f(x) = not g(x)
+    e.g: not_(arg > 10)
+    '''
+    return UnaryOperation(Operator.__not__, operation).intern()
+
+
+# Attributes and function calls
+
+def getattr_(operation, name):
+    '''
+    Returns an operation which is defined like f(x) = g(x).name
+    Its the same as operation.name but it also works for names of methods of the class Operation (e.g.
+    getattr_(arg, 'format')('a') evaluates to x.format('a'))
+    '''
+    if not isinstance(operation, Operation):
+        operation = Constant(operation).intern()
+    return AttributeOperation(operation, name).intern()
+
+
+def call(func, *args, **kwargs):
+    '''
+    Returns an operation which is defined like f(x) = func(g1(x), g2(x), ...)
+    Arguments that are not operations are passed as constants.
+    e.g: call(math.sqrt, arg) > 2
+    '''
+    return CallOperation(func, args, kwargs).intern()
+
+
+def len_(operation):
+    '''
+    Returns an operation which is defined like f(x) = len(g(x))
+    '''
+    return call(len, operation)
+
+
+def abs_(operation):
+    '''
+    Returns an operation which is defined like f(x) = abs(g(x))
+    '''
+    return call(abs, operation)
+
+
+def min_(*args, **kwargs):
+    '''
+    Returns an operation which is defined like f(x) = min(g1(x), g2(x), ...)
+    '''
+    return call(min, *args, **kwargs)
+
+
+def max_(*args, **kwargs):
+    '''
+    Returns an operation which is defined like f(x) = max(g1(x), g2(x), ...)
+    '''
+    return call(max, *args, **kwargs)
+
+
+def sum_(*args, **kwargs):
+    '''
+    Returns an operation which is defined like f(x) = sum(g1(x), ...)
+    '''
+    return call(sum, *args, **kwargs)
+
+
+def round_(*args, **kwargs):
+    '''
+    Returns an operation which is defined like f(x) = round(g1(x), ...)
+    '''
+    return call(round, *args, **kwargs)
+
+
+def isinstance_(operation, types):
+    '''
+    Returns an operation which is defined like f(x) = isinstance(g(x), types)
+    '''
+    return call(isinstance, operation, types)
 
 
 # Identity aliases
-placeholder = Identity()
+placeholder = Identity().intern()
 arg = placeholder
@@ -1,11 +1,22 @@
 '''
-This module defines the classes Processor, ProcessorBundle, ValidateInput and ParseInput
+This module defines the classes Processor, ProcessorBundle, ValidateInput, ParseInput and Stage
 '''
 
 from .utils import iterable
 from .exceptions import ParsingError, ValidationError
 from itertools import count
-from src.validators import Validator
+from random import random
+from numbers import Real
+from concurrent.futures import Executor
+from src.validators import Validator, EmptyValidator
+from src.operations import Operation, Identity
+
+
+def identity(arg):
+    '''
+    Parser that leaves the input value unchanged
+    '''
+    return arg
 
 class Processor:
     '''
@@ -19,6 +30,14 @@ class Processor:
         '''
         return args
 
+    def stages(self):
+        '''
+        Splits this processor in independent stages, one for each input value. Can be implemented by subclasses.
+        :return: Returns a list with the validators or parsers applied to each input value (None can be used to indicate
+        that an input value is left unchanged) or None if this processor cannot be splitted.
+        '''
+        return None
+
 
 
 class ProcessorBundle(Processor):
@@ -28,6 +47,35 @@ class ProcessorBundle(Processor):
     def __init__(self):
         super().__init__()
         self.processors = []
+        self.chains = ()
+        self.validation = True
+        self.sampler = None
+
+    @property
+    def validation_enabled(self):
+        '''
+        Its True if the input values are validated, False if ValidateInput processors are skipped (parsers are
+        applied anyway)
+        '''
+        return self.validation
+
+    def get_sampler(self, processor):
+        '''
+        Returns the sampler which decides in which calls the given processor validates the input values or None if they
+        must be validated on every call. The sampler of the processor takes precedence over the sampler of this bundle.
+        '''
+        if not isinstance(processor, ValidateInput):
+            return None
+        sampler = processor.sampler if processor.sampler is not None else self.sampler
+        return sampler if sampler is not None and sampler.rate < 1 else None
+
+    def sampled_out(self):
+        '''
+        Decides which processors dont validate the input values in the current call (when validation is sampled)
+        :return: Returns a set with such processors.
+        '''
+        samplers = [(processor, self.get_sampler(processor)) for processor in self.processors]
+        return frozenset(processor for processor, sampler in samplers if sampler is not None and not sampler())
 
     def append(self, processor):
         '''
@@ -38,9 +86,46 @@ class ProcessorBundle(Processor):
         if not isinstance(processor, Processor):
             raise TypeError()
         self.processors.append(processor)
+        self.chains = self.fuse()
+
+    def fuse(self):
+        '''
+        Flattens the stack of processors in one chain of stages for each input value. Stages are sorted in the same
+        order as processors are applied and the ones that leave the input values unchanged are dropped.
+        :return: Returns a tuple with one chain for each input value (a tuple of Stage instances) or None if some
+        processors cannot be splitted in stages or they dont process the same number of input values.
+        '''
+        processors = tuple(reversed(self.processors))
+        items = [processor.stages() for processor in processors]
+        if any(stages is None for stages in items):
+            return None
+        if len(frozenset(map(len, items))) > 1:
+            return None
+
+        chains = [[] for stages in items[:1] for item in stages]
+        for level, processor, stages in zip(count(start=0), processors, items):
+            for index, item in enumerate(stages):
+                if item is not None:
+                    chains[index].append(Stage(processor, item, index, level if len(processors) > 1 else None))
+        return tuple(map(tuple, chains))
 
     def process_input(self, *args):
+        validation = self.validation_enabled
+        skipped = self.sampled_out() if validation else frozenset()
+
+        chains = self.chains
+        if chains is not None and len(chains) == len(args):
+            result = []
+            for chain, arg in zip(chains, args):
+                for stage in chain:
+                    if not stage.validates or (validation and stage.processor not in skipped):
+                        arg = stage(arg)
+                result.append(arg)
+            return result
+
         for level, processor in zip(count(start=0), reversed(self.processors)):
+            if isinstance(processor, ValidateInput) and (not validation or processor in skipped):
+                continue
             try:
                 args = processor.process_input(*args)
             except ParsingError as e:
@@ -72,6 +157,11 @@ class ParseInput(Processor):
     def process_input(self, *args):
         return self.parse(*args)
 
+    def stages(self):
+        # Expressions are compiled to evaluate them faster
+        return [None if item is identity or isinstance(item, Identity) else
+                item.compile() if isinstance(item, Operation) else item for item in self.items]
+
     def parse(self, *args):
         if len(self.items) != len(args):
             raise ValueError()
@@ -84,7 +174,7 @@ class ParseInput(Processor):
                         result.append(arg)
                         continue
                     arg = arg.wrapped_value
-                result.append(item(arg))
+                result.append(item.evaluate(arg) if isinstance(item, Operation) else item(arg))
             except Exception as e:
                 raise ParsingError(index, str(e))
         return result
@@ -95,17 +185,26 @@ class ValidateInput(Processor):
     '''
     Its a processor which validates the input values using the given validators.
     '''
-    def __init__(self, items):
+    def __init__(self, items, sample=None, executor=None):
         '''
         Initializes this instance.
         :param items: Must be an iterable list with Validator instance objects to validate the input values.
+        :param sample: If not None, only a subset of the calls are validated. It can be the fraction of calls to
+        validate (a number in the range (0, 1]) or a Sampler instance.
+        :param executor: An optional instance of concurrent.futures.Executor (usually a ThreadPoolExecutor). If
+        indicated and more than one input value have validators which are not cheap, they are validated in parallel
+        with it.
         '''
+        if executor is not None and not isinstance(executor, Executor):
+            raise TypeError('executor must be an instance of concurrent.futures.Executor')
         if not iterable(items):
             raise TypeError()
         validators = tuple(items)
         if not all(map(lambda v: isinstance(v, Validator), validators)):
             raise TypeError()
         self.validators = validators
+        self.sampler = sample if sample is None or isinstance(sample, Sampler) else Sampler(sample)
+        self.executor = executor
 
     def validate(self, *args):
         for validator, index, arg in zip(self.validators, count(start=0), args):
@@ -124,5 +223,114 @@ class ValidateInput(Processor):
         self.validate(*args)
         return args
 
+    def stages(self):
+        return [validator if not isinstance(validator, EmptyValidator) else None for validator in self.validators]
+
+
+
+class Sampler:
+    '''
+    Decides which calls are validated when validation is sampled.
+    '''
+    def __init__(self, rate, random=False):
+        '''
+        Initializes this instance.
+        :param rate: Fraction of the calls to be validated. Must be a number in the range (0, 1]
+        :param random: If False (default), calls are validated deterministically: one of every round(1 / rate) calls,
+        starting with the first one. Otherwise, each call is validated with probability rate.
+        '''
+        if not isinstance(rate, Real) or isinstance(rate, bool):
+            raise TypeError('Sample rate must be a number')
+        if not 0 < rate <= 1:
+            raise ValueError('Sample rate must be in the range (0, 1]')
+        if not isinstance(random, bool):
+            raise TypeError()
+
+        self.rate = rate
+        self.random = random
+        self.period = max(1, round(1 / rate))
+        # Number of calls so far (used when sampling deterministically)
+        self.counter = count()
+
+    def __call__(self):
+        '''
+        Returns True if the current call must be validated, False otherwise.
+        '''
+        if self.random:
+            return random() < self.rate
+        return next(self.counter) % self.period == 0
+
+
+
+class Stage:
+    '''
+    Its a single step of the chain of operations applied to an input value: A validator or parser taken from one of
+    the processors of a bundle.
+    '''
+    def __init__(self, processor, item, index, level):
+        '''
+        Initializes this instance.
+        :param processor: The processor this stage was taken from (ValidateInput or ParseInput instance)
+        :param item: The validator or parser to apply.
+        :param index: Index of the input value processed by this stage (starting with 0 for the first argument)
+        :param level: Level of the processor in the bundle (used when reporting errors) or None
+        '''
+        self.processor = processor
+        self.item = item
+        self.index = index
+        self.level = level
+        self.validates = isinstance(processor, ValidateInput)
+
+    def __call__(self, arg):
+        '''
+        Applies this stage to the given input value.
+        :return: Returns the processed value. Raises a ValidationError or ParsingError exception if it fails.
+        '''
+        value = arg
+        if isinstance(arg, InputValueWrapper):
+            if not (arg.validate if self.validates else arg.parse):
+                return arg
+            value = arg.wrapped_value
+        try:
+            if self.validates:
+                self.item(value)
+                return arg
+            return self.item(value)
+        except Exception as e:
+            raise self.error(e)
+
+    async def call_async(self, arg):
+        '''
+        Asynchronous version of __call__(). Asynchronous validators are awaited.
+        '''
+        if not self.validates or not self.item.is_async:
+            return self(arg)
+        value = arg
+        if isinstance(arg, InputValueWrapper):
+            if not arg.validate:
+                return arg
+            value = arg.wrapped_value
+        try:
+            await self.item.call_async(value)
+            return arg
+        except Exception as e:
+            raise self.error(e)
+
+    @property
+    def is_async(self):
+        '''
+        Its True if this stage needs to be awaited (see call_async())
+        '''
+        return self.validates and self.item.is_async
+
+    def error(self, e):
+        '''
+        Creates the exception to be raised when this stage fails.
+        :param e: The exception raised by the validator or parser
+        '''
+        error = (ValidationError if self.validates else ParsingError)(self.index, str(e))
+        error.level = self.level
+        return error
+
 # This import is written here because of cyclic import issues
 from .wrappers import InputValueWrapper
\ No newline at end of file
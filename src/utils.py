@@ -5,6 +5,7 @@ This module provides helper routines for the rest of the modules in this library
 
 from itertools import islice
 from types import FunctionType
+import sys
 
 
 def iterable(x):
@@ -35,6 +36,50 @@ def hashable(x):
     return False
 
 
+def is_ndarray(x):
+    '''
+    Checks if an object is a numpy array (without importing numpy if its not imported yet)
+    :param x:
+    :return:
+    '''
+    np = sys.modules.get('numpy')
+    return np is not None and isinstance(x, np.ndarray)
+
+
+def overrides_class(cls):
+    '''
+    Checks if the instances of the given class can report a different class (their attribute __class__ is
+    redefined, like the one of proxies or mocks with specs). Then, isinstance() may not give the same result for all
+    the objects of that type.
+    :param cls:
+    :return:
+    '''
+    return any('__class__' in vars(base) for base in cls.__mro__[:-1])
+
+
+def canonical(x):
+    '''
+    Returns a hashable object for the given one such that canonical(x) == canonical(y) if x == y. Its x itself if
+    its hashable. Otherwise, lists and tuples are turned into tuples, sets into frozensets and dictionaries into
+    frozensets of their items (recursively)
+    Raises TypeError if the object is not hashable and it is not any of those.
+    :param x:
+    :return:
+    '''
+    try:
+        hash(x)
+        return x
+    except TypeError:
+        pass
+    if isinstance(x, (list, tuple)):
+        return tuple(map(canonical, x))
+    if isinstance(x, (set, frozenset)):
+        return frozenset(x)
+    if isinstance(x, dict):
+        return frozenset((key, canonical(value)) for key, value in x.items())
+    raise TypeError('{} object cannot be hashed'.format(type(x).__name__))
+
+
 def format_range(x):
     '''
     Stringifies a range object for pretty printing in error messages.
@@ -48,6 +93,21 @@ def format_range(x):
         return str(list(x))
     return '[{}]'.format(', '.join(map(str, tuple(x[:2]) + ('...',) + tuple(x[-2:]))))
 
+def format_interval(lower, upper, lower_closed, upper_closed):
+    '''
+    Stringifies an interval for pretty printing in error messages.
+    :param lower: The lower bound or None if it has no lower bound.
+    :param upper: The upper bound or None if it has no upper bound.
+    :param lower_closed: True if the lower bound is in the interval.
+    :param upper_closed: True if the upper bound is in the interval.
+    :return:
+    '''
+    lower_closed = lower_closed and lower is not None and lower != float('-inf')
+    upper_closed = upper_closed and upper is not None and upper != float('inf')
+    return '{}{}, {}{}'.format(
+        '[' if lower_closed else '(', lower if lower is not None and lower != float('-inf') else '-inf',
+        upper if upper is not None and upper != float('inf') else '+inf', ']' if upper_closed else ')')
+
 def format_sequence(x):
     '''
     Stringifies an iterable object for pretty printing in error messages.
@@ -67,4 +127,19 @@ def islambda(x):
     :param x:
     :return:
     '''
-    return isinstance(x, FunctionType) and x.__name__ == '<lambda>'
\ No newline at end of file
+    return isinstance(x, FunctionType) and x.__name__ == '<lambda>'
+
+def funcname(x):
+    '''
+    Returns the qualified name of a function or callable object to be displayed in error messages or None if its a
+    lambda function or it doesnt have a name.
+    :param x:
+    :return:
+    '''
+    if islambda(x):
+        return None
+    if hasattr(x, '__qualname__'):
+        return x.__qualname__
+    if hasattr(x, '__name__'):
+        return x.__name__
+    return None
@@ -4,11 +4,23 @@ This module defines all kinds of validators that can be used to validate your fu
 '''
 
 
-from .utils import iterable as _iterable, hashable as _hashable, format_sequence, format_range, islambda
-from .operations import Operation
-from inspect import isclass
+from .utils import iterable as _iterable, hashable as _hashable, format_sequence, format_range, funcname, is_ndarray
+from .utils import canonical, format_interval, overrides_class
+from bisect import bisect_right
+from .operations import Operation, Compiler, Identity, Constant, BinaryOperation, LogicalOperation, CallOperation
+from .operations import Operator
+from inspect import isclass, iscoroutinefunction
 import re
 from decimal import Decimal
+from threading import Lock, Event
+from asyncio import get_running_loop
+from weakref import WeakKeyDictionary
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, chain
+from collections import namedtuple
+import pickle
+from time import perf_counter
+from abc import ABCMeta, get_cache_token
 
 
 
@@ -17,6 +29,26 @@ class Validator:
     Instances of this class represents validators that verifies if function input arguments are correct or not.
     '''
 
+    # Its True if this validator needs to be awaited (it can only validate arguments of coroutine functions with
+    # validate_async() or call_async())
+    is_async = False
+
+    # Its True if this validator cannot validate arguments synchronously (functions decorated with it must be
+    # coroutine functions)
+    async_only = False
+
+    # Its True if validating an argument with this validator takes little time (it is never worth to run it in
+    # other thread)
+    is_cheap = False
+
+    # Its True if validating an argument with this validator has no side effects (composed validators in adaptive
+    # mode can change the order in which they try it)
+    is_pure = False
+
+    # Its True if the result of validating an argument only depends on its type (its never worth to validate two
+    # arguments of the same type)
+    type_only = False
+
     def __call__(self, arg):
         '''
         Validates the input argument with this validator instance:
@@ -35,6 +67,21 @@ class Validator:
         '''
         raise NotImplementedError()
 
+    async def call_async(self, arg):
+        '''
+        Asynchronous version of __call__()
+        '''
+        if not await self.validate_async(arg):
+            raise Exception(self.error_message(arg))
+        return True
+
+    async def validate_async(self, arg):
+        '''
+        Asynchronous version of validate(). By default it just calls validate(). Must be implemented by asynchronous
+        validators.
+        '''
+        return self.validate(arg)
+
     def error_message(self, arg):
         '''
         This is called to generate an error message to be displayed with information telling why the input argument
@@ -42,6 +89,78 @@ class Validator:
         '''
         return ''
 
+    def validate_parallel(self, values, processes=None, chunksize=1024):
+        '''
+        Validates a batch of values sharding it across a pool of processes, so that CPU-heavy validators written in
+        pure Python can use all the cores.
+        This validator and the values must be picklable: Validators defined with lambdas or local functions cannot be
+        used, but Operation expressions (e.g. arg ** 2 < 100) or module-level functions can.
+        :param values: An iterable with the values to validate.
+        :param processes: Number of worker processes. By default, the number of processors of the machine. If its 1,
+        the values are validated in the current process.
+        :param chunksize: Number of values sent at once to a worker process.
+        :return: Returns a list of (index, message) tuples with the index of each invalid value and the error message
+        that explains why it is not valid (sorted by index)
+        '''
+        if self.is_async:
+            raise TypeError('Asynchronous validators cannot validate values in parallel')
+        if processes is not None and (not isinstance(processes, int) or processes < 1):
+            raise ValueError('processes must be an int value greater or equal than 1')
+        if not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize must be an int value greater or equal than 1')
+
+        values = iter(values)
+        if processes == 1:
+            return validate_chunk(self, 0, values)
+
+        try:
+            state = pickle.dumps(self)
+        except Exception as e:
+            raise TypeError('Validator {} cannot be sent to other processes: {}'.format(self, e)) from e
+
+        with ProcessPoolExecutor(processes, initializer=init_worker, initargs=(state,)) as executor:
+            futures, start = [], 0
+            while True:
+                chunk = list(islice(values, chunksize))
+                if not chunk:
+                    break
+                futures.append(executor.submit(validate_worker_chunk, start, chunk))
+                start += len(chunk)
+            return [failure for future in futures for failure in future.result()]
+
+    def validate_column(self, values):
+        '''
+        Validates a list of input values at once (e.g. all the values that an argument takes in a batch of calls, see
+        FuncWrapper.starmap())
+        Validators without side effects are applied with map() and the ones whose result only depends on the type of
+        the arguments are applied once for each different type.
+        Subclasses may override this method to validate the values faster.
+        :return: Returns the index of the first value which is not valid or None if all of them are valid.
+        '''
+        types = frozenset(map(type, values)) if self.type_only else None
+        if types is not None and not any(map(overrides_class, types)):
+            # One value of each type is validated
+            if not values:
+                return None
+            if len(types) == 1:
+                return None if self.validate(values[0]) else 0
+            types = list(map(type, values))
+            invalid = [types.index(cls) for cls in frozenset(types) if not self.validate(values[types.index(cls)])]
+            return min(invalid) if invalid else None
+        if self.is_pure and all(map(self.validate, values)):
+            return None
+        return next((index for index, valid in enumerate(map(self.validate, values)) if not valid), None)
+
+    def optimize(self):
+        '''
+        Returns a validator equivalent to this one that validates arguments faster (or this same instance if it
+        cannot be optimized). Composed validators are simplified: Nested disjunctions and conjunctions are flattened,
+        double inversions are removed and type checks implied by others are dropped (e.g. Int & number is replaced
+        with Int).
+        Subclasses may override this method.
+        '''
+        return self
+
     # Operators to created composed validators
 
     def __or__(self, other):
@@ -54,7 +173,7 @@ class Validator:
         return InvertedValidator(self)
 
     def __xor__(self, other):
-        return self & ~other | ~self & other
+        return XorValidator(self, other)
 
     def __str__(self):
         return self.__class__.__name__
@@ -76,9 +195,9 @@ class Validator:
         if isinstance(obj, Validator):
             return obj
 
-        # Expressions
+        # Expressions (simple ones are replaced with native validators)
         if isinstance(obj, Operation):
-            return UserValidator(obj)
+            return lower_expression(obj) or UserValidator(obj)
 
 
         # Classes and built-in types.
@@ -99,6 +218,10 @@ class Validator:
 
         # Iterables (only list, tuples, frozensets and sets)
         if isinstance(obj, (list, tuple, set, frozenset)):
+            # Unions of ranges or intervals
+            if len(obj) > 1 and (all(isinstance(item, range) and item.step == 1 for item in obj) or
+                                 all(isinstance(item, IntervalValidator) for item in obj)):
+                return IntervalUnionValidator(obj)
             if any(map(isclass, obj)) or any(map(_iterable, obj)):
                 return DisjunctValidator([Validator.from_spec(item) for item in obj])
             return ValueValidator(obj)
@@ -111,22 +234,57 @@ class UserValidator(Validator):
     '''
     Validators defined by the user.
     '''
-    def __init__(self, func):
+    def __init__(self, func, chunksize=65536):
         '''
         Initializes this instance. A function or callable object must be passed as argument
         That function will be invoked when an input argument must be validated with this instance.
         It must accept one argument and return something that evaluates to True if such argument is valid or something
         that evaluates to false or raise an exception otherwise.
+        It can also be a coroutine function. In that case, the validator is asynchronous.
+
+        It can also be an expression (instance of Operation). When validating numpy arrays, expressions are evaluated
+        elementwise: arrays are valid if the expression evaluates to true for all their elements.
+        :param chunksize: Expressions that are evaluated elementwise (e.g. (arg >= 0) & (arg <= 1)) validate arrays
+        with more elements than this in chunks of this size, so that no temporary arrays of the same size are needed.
         '''
         if not callable(func):
             raise TypeError()
+        if not isinstance(chunksize, int):
+            raise TypeError('chunksize must be an int value')
+        if chunksize < 1:
+            raise ValueError('chunksize must be greater or equal than 1')
 
         super().__init__()
         self.func = func
+        self.is_async = iscoroutinefunction(func)
+        self.async_only = self.is_async
+        # Expressions are compiled to evaluate them faster
+        self.predicate = func.compile() if isinstance(func, Operation) else func
+        # Its True if numpy arrays (and scalars) are validated elementwise
+        self.vectorized = isinstance(func, Operation)
+        self.chunksize = chunksize if self.vectorized and func.elementwise() else None
+        # Expressions that call no user functions have no side effects
+        self.is_pure = self.vectorized and is_pure(func)
 
     def __call__(self, arg):
+        if self.is_async:
+            raise TypeError('Asynchronous validators can only validate arguments of coroutine functions')
+        try:
+            if self.vectorized and type(arg).__module__ == 'numpy':
+                if self.validate_array(arg):
+                    return True
+            elif self.predicate(arg):
+                return True
+        except Exception as e:
+            if len(str(e)) > 0:
+                raise e
+        raise Exception(self.error_message(arg))
+
+    async def call_async(self, arg):
+        if not self.is_async:
+            return self(arg)
         try:
-            if self.func(arg):
+            if await self.func(arg):
                 return True
         except Exception as e:
             if len(str(e)) > 0:
@@ -134,32 +292,362 @@ class UserValidator(Validator):
         raise Exception(self.error_message(arg))
 
     def validate(self, arg):
+        if self.is_async:
+            raise TypeError('Asynchronous validators can only validate arguments of coroutine functions')
         try:
-            return self.func(arg)
+            if self.vectorized and type(arg).__module__ == 'numpy':
+                return self.validate_array(arg)
+            return self.predicate(arg)
         except:
             return False
 
+    def validate_column(self, values):
+        if self.is_pure and not self.is_async:
+            # The compiled expression is evaluated for all the values without calling validate()
+            try:
+                if all(map(self.predicate, values)):
+                    return None
+            except Exception:
+                pass
+        return super().validate_column(values)
+
+    def evaluate_array(self, arg):
+        '''
+        Evaluates the expression of this validator for the given numpy array (in chunks if possible)
+        :return: Returns an iterator of (start, result) tuples: the results of the expression and the index of the
+        first element of the chunk (in the flattened array) which they belong to. If the array is not evaluated in
+        chunks, there is only one tuple with start set to None.
+        '''
+        if self.chunksize is None or arg.size <= self.chunksize:
+            yield None, self.predicate(arg)
+            return
+        # Chunks are views when the array is contiguous
+        flat = arg.reshape(-1) if arg.flags.c_contiguous else arg.flat
+        for start in range(0, arg.size, self.chunksize):
+            yield start, self.predicate(flat[start:start+self.chunksize])
+
+    def validate_array(self, arg):
+        '''
+        Returns True if the expression of this validator evaluates to true for all the elements of the given numpy
+        array (it stops at the first chunk with an invalid element)
+        '''
+        import numpy as np
+        return all(np.all(result) for start, result in self.evaluate_array(arg))
+
+    async def validate_async(self, arg):
+        if not self.is_async:
+            return self.validate(arg)
+        try:
+            return await self.func(arg)
+        except:
+            return False
+
+    def __getstate__(self):
+        # Compiled expressions cannot be pickled (they are compiled again when unpickling)
+        state = self.__dict__.copy()
+        del state['predicate']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.predicate = self.func.compile() if isinstance(self.func, Operation) else self.func
+
     def error_message(self, arg):
         func = self.func
+        if isinstance(func, Operation) and is_ndarray(arg):
+            return self.array_error_message(arg)
         if isinstance(func, Operation):
             return 'Expression {} evaluated to false'.format(func.format(arg))
 
-        if not islambda(func):
-            if hasattr(func, '__qualname__'):
-                s = func.__qualname__
-            elif hasattr(func, '__name__'):
-                s = func.__name__
-            else:
-                s = None
-        else:
-            s = None
+        s = funcname(func)
         return 'Expression{} evaluated to false'.format(' {}({})'.format(s, arg) if s is not None else '', str(arg))
 
 
+    def array_error_message(self, arg):
+        '''
+        Returns the error message for a numpy array which is not valid: It includes the number of elements for which
+        the expression evaluated to false and the index of the first one.
+        '''
+        import numpy as np
+        invalid, size, first = 0, 0, None
+        for start, result in self.evaluate_array(arg):
+            result = np.asarray(result)
+            if result.ndim == 0:
+                # The expression is not evaluated elementwise (e.g. x.shape[0] == 3)
+                return 'Expression {} evaluated to false'.format(self.func)
+            failures = np.flatnonzero(np.logical_not(result))
+            if first is None and len(failures) > 0:
+                first = np.unravel_index(failures[0] + (start or 0), arg.shape if start is not None else result.shape)
+            invalid, size = invalid + len(failures), size + result.size
+        if first is None:
+            return 'Expression {} evaluated to false'.format(self.func)
+        return 'Expression {} evaluated to false for {} of {} elements (first one at index {})'.format(
+            self.func, invalid, size, tuple(map(int, first)) if len(first) != 1 else int(first[0]))
+
+
+class BatchValidator(UserValidator):
+    '''
+    Validator that checks many arguments at once with a bulk lookup function: Values to validate from calls in flight
+    (made by different threads, or concurrent coroutines in the same event loop) are collected for a small time window
+    or until a maximum number of them is reached. Then, the lookup function is called once with all of them.
+    '''
+    def __init__(self, func, delay=0.001, max_size=128):
+        '''
+        Initializes this instance.
+        :param func: The bulk lookup function. It must accept a list of values and return an iterable with the same
+        number of items: something that evaluates to True for each valid value and to False otherwise. If it raises an
+        exception, all the values of the batch are considered invalid. It can also be a coroutine function (but then
+        this validator can only be used by coroutine functions)
+        :param delay: Maximum time (in seconds) to wait for more values before calling the lookup function.
+        :param max_size: Maximum number of values passed at once to the lookup function.
+        '''
+        if not callable(func):
+            raise TypeError()
+        if not isinstance(delay, (int, float)):
+            raise TypeError('delay must be a number')
+        if delay < 0:
+            raise ValueError('delay must be greater or equal than 0')
+        if not isinstance(max_size, int):
+            raise TypeError('max_size must be an int value')
+        if max_size < 1:
+            raise ValueError('max_size must be greater or equal than 1')
+
+        # Values are validated with lookup_async() when validating arguments of coroutine functions
+        super().__init__(self.lookup_async)
+        # Values are validated synchronously with lookup() unless the lookup function is a coroutine function
+        self.async_only = iscoroutinefunction(func)
+        self.bulk_func = func
+        self.delay = delay
+        self.max_size = max_size
+
+        self.lock = Lock()
+        # The batch being collected by threads and the ones being collected by coroutines of each event loop
+        self.batch = None
+        self.async_batches = WeakKeyDictionary()
+
+    def __call__(self, arg):
+        try:
+            if self.lookup(arg):
+                return True
+        except Exception as e:
+            if len(str(e)) > 0:
+                raise e
+        raise Exception(self.error_message(arg))
+
+    def validate(self, arg):
+        try:
+            return self.lookup(arg)
+        except:
+            return False
+
+    def lookup(self, arg):
+        '''
+        Adds the given value to the current batch and waits until the lookup function is called.
+        The thread that adds the first value of a batch calls the lookup function once the time window expires
+        (or the one that fills the batch)
+        :return: Returns the result of the lookup function for the given value (raises an exception if it failed)
+        '''
+        if iscoroutinefunction(self.bulk_func):
+            raise TypeError('Asynchronous validators can only validate arguments of coroutine functions')
+
+        with self.lock:
+            batch, leader = self.batch, self.batch is None
+            if leader:
+                batch = self.batch = Batch()
+            index = batch.add(arg)
+            flush = len(batch.values) >= self.max_size
+            if flush:
+                self.batch = None
+
+        if not flush and leader and not batch.done.wait(self.delay):
+            with self.lock:
+                flush = self.batch is batch
+                if flush:
+                    self.batch = None
+        if flush:
+            try:
+                batch.resolve(self.bulk_func(batch.values))
+            except Exception as e:
+                batch.fail(e)
+        batch.done.wait()
+        return batch.result(index)
+
+    def validate_column(self, values):
+        # The values are already collected: The lookup function is called once for each max_size values without
+        # waiting for other calls
+        for start in range(0, len(values), self.max_size):
+            batch = Batch()
+            for value in values[start:start+self.max_size]:
+                batch.add(value)
+            try:
+                batch.resolve(self.bulk_func(batch.values))
+            except Exception as e:
+                batch.fail(e)
+            if batch.error is not None:
+                return start
+            index = next((index for index, result in enumerate(batch.results) if not result), None)
+            if index is not None:
+                return start + index
+        return None
+
+    async def lookup_async(self, arg):
+        '''
+        Asynchronous version of lookup(): The lookup function is called once the time window expires using the
+        event loop or when the batch is full.
+        '''
+        loop = get_running_loop()
+        batch = self.async_batches.get(loop)
+        if batch is None:
+            batch = self.async_batches[loop] = Batch()
+            batch.handle = loop.call_later(self.delay, self.flush_async, loop, batch)
+        future = loop.create_future()
+        batch.add(arg, future)
+        if len(batch.values) >= self.max_size:
+            self.flush_async(loop, batch)
+        return await future
+
+    def flush_async(self, loop, batch):
+        '''
+        Calls the lookup function for the given batch of values (collected in the given event loop)
+        '''
+        if self.async_batches.get(loop) is batch:
+            del self.async_batches[loop]
+        batch.handle.cancel()
+
+        if not iscoroutinefunction(self.bulk_func):
+            try:
+                batch.resolve(self.bulk_func(batch.values))
+            except Exception as e:
+                batch.fail(e)
+            return
+
+        async def resolve():
+            try:
+                batch.resolve(await self.bulk_func(batch.values))
+            except Exception as e:
+                batch.fail(e)
+        loop.create_task(resolve())
+
+    def error_message(self, arg):
+        s = funcname(self.bulk_func)
+        return 'Expression{} evaluated to false'.format(' {}([{}])'.format(s, arg) if s is not None else '')
+
+
+    def __getstate__(self):
+        # Locks and batches in progress are not copied
+        state = super().__getstate__()
+        for key in ('lock', 'batch', 'async_batches'):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.lock = Lock()
+        self.batch = None
+        self.async_batches = WeakKeyDictionary()
+
+
+class Batch:
+    '''
+    Its a set of values collected by a BatchValidator to be validated at once.
+    '''
+    def __init__(self):
+        self.values = []
+        self.futures = []
+        self.results = None
+        self.error = None
+        self.done = Event()
+        self.handle = None
+
+    def add(self, value, future=None):
+        '''
+        Adds a new value to this batch and returns its index. future must be indicated if the value was added by a
+        coroutine.
+        '''
+        self.values.append(value)
+        self.futures.append(future)
+        return len(self.values) - 1
+
+    def resolve(self, results):
+        '''
+        Sets the results of the lookup function for the values of this batch
+        '''
+        try:
+            results = list(results)
+            if len(results) != len(self.values):
+                raise ValueError('Lookup function returned {} results for {} values'.format(len(results), len(self.values)))
+        except Exception as e:
+            self.fail(e)
+            return
+        self.results = results
+        for future, result in zip(self.futures, results):
+            if future is not None and not future.done():
+                future.set_result(result)
+        self.done.set()
+
+    def fail(self, e):
+        '''
+        Indicates that the lookup function raised the given exception.
+        '''
+        self.error = e
+        for future in self.futures:
+            if future is not None and not future.done():
+                future.set_exception(e)
+        self.done.set()
+
+    def result(self, index):
+        '''
+        Returns the result of the lookup function for the value at the given index or raises the exception raised by
+        the lookup function.
+        '''
+        if self.error is not None:
+            raise self.error
+        return self.results[index]
+
+
+def validate_chunk(validator, start, values):
+    '''
+    Validates the given values with a validator.
+    :param start: Index of the first value (used to report the invalid ones)
+    :return: Returns a list of (index, message) tuples for each value which is not valid.
+    '''
+    failures = []
+    for index, value in enumerate(values, start):
+        try:
+            validator(value)
+        except Exception as e:
+            failures.append((index, str(e)))
+    return failures
+
+
+# The validator used by this process if its a worker of Validator.validate_parallel()
+worker_validator = None
+
+
+def init_worker(state):
+    '''
+    Initializes a worker process of Validator.validate_parallel(): The validator is unpickled only once by each
+    worker.
+    '''
+    global worker_validator
+    worker_validator = pickle.loads(state)
+
+
+def validate_worker_chunk(start, values):
+    '''
+    Validates a chunk of values in a worker process of Validator.validate_parallel() (see validate_chunk())
+    '''
+    return validate_chunk(worker_validator, start, values)
+
+
 class EmptyValidator(Validator):
     '''
     Validator that matches any input argument.
     '''
+    is_cheap = True
+    is_pure = True
+    type_only = True
+
     def validate(self, arg):
         return True
 
@@ -169,8 +657,21 @@ class DisjunctValidator(Validator):
     This validator is composed by a set of different validators (at least 1).
     An input argument is considered valid if its also valid for at least one of the validators that
     this instance is composed with.
+
+    Type and value validators are merged and the arguments are dispatched by their type: The validators that could
+    accept arguments of a given type are computed the first time an argument of that type is validated and the result
+    is stored in a table, so that the next ones only require a dict lookup.
     '''
-    def __init__(self, items):
+    # Maximum number of entries of the dispatch table (its cleared when its full)
+    table_size = 256
+
+    def __init__(self, items, adaptive=False):
+        '''
+        Initializes this instance.
+        :param items: The validators (or validator specs) this instance is composed with.
+        :param adaptive: If True, the cost of the validators and how often they decide the result are measured
+        and they are periodically reordered to find valid arguments as soon as possible (see stats())
+        '''
         if not _iterable(items):
             raise TypeError()
         validators = tuple([item if isinstance(item, Validator) else Validator.from_spec(item) for item in items])
@@ -178,13 +679,127 @@ class DisjunctValidator(Validator):
             raise ValueError()
 
         self.validators = tuple(validators)
+        self.is_async = any(validator.is_async for validator in validators)
+        self.async_only = any(validator.async_only for validator in validators)
+        self.is_cheap = all(validator.is_cheap for validator in validators)
+        self.is_pure = all(validator.is_pure for validator in validators)
+        self.type_only = all(validator.type_only for validator in validators)
+        self.profile = Profile(self.validators) if adaptive else None
+        self.predicate = compile_validators(self.validators, ' or ')
+
+        # Merge all the type validators in a single tuple of types and all the value validators in a single one
+        types = [cls for validator in validators if type(validator) == TypeValidator for cls in validator.types]
+        values = [value for validator in validators if type(validator) == ValueValidator
+                  for bucket in chain(validator.index.values(), (validator.unindexed,)) for value in bucket]
+        self.types = tuple(types)
+        self.values = ValueValidator(values) if values else None
+        self.value_types = frozenset(map(type, values))
+        self.others = tuple(validator for validator in validators
+                            if type(validator) not in (TypeValidator, ValueValidator))
+        # Dispatching is only worth if there are type or value validators to merge or skip
+        self.table = {} if len(self.others) < len(validators) else None
+        # Subclass checks against abstract base classes can change when new subclasses are registered
+        self.abstract = any(isinstance(cls, ABCMeta) for cls in types)
+        self.token = get_cache_token()
+
+    def dispatch(self, arg):
+        '''
+        Computes the entry of the dispatch table for arguments of the same type as the given one (its class must be
+        its type, see validate())
+        :return: True if all the arguments of that type are valid, a tuple with the validators that could accept them
+        or None if they must be validated with all the validators (the validators were compiled in a single predicate)
+        '''
+        if self.abstract and self.token != get_cache_token():
+            self.table.clear()
+            self.token = get_cache_token()
+        if len(self.table) >= self.table_size:
+            self.table.clear()
+
+        cls, types = type(arg), self.types
+        if object in types or (bool in types if cls == bool else isinstance(arg, types)):
+            candidates = True
+        else:
+            candidates = []
+            if cls in self.value_types:
+                candidates.append(self.values)
+            for validator in self.others:
+                if type(validator) == RangeValidator:
+                    if cls != int:
+                        continue
+                elif type(validator) == IntervalUnionValidator and validator.types is not None:
+                    if cls not in validator.types:
+                        continue
+                elif self.predicate is not None:
+                    candidates = None
+                    break
+                candidates.append(validator)
+            if candidates is not None:
+                candidates = tuple(candidates)
+        self.table[cls] = candidates
+        return candidates
 
     def validate(self, arg):
+        if self.profile is not None:
+            return self.profile.run(arg, True)
+        # Objects whose class is not their type (proxies, mocks with specs, ...) are not dispatched by their type
+        if self.table is not None and arg.__class__ is type(arg):
+            if self.abstract and self.token != get_cache_token():
+                candidates = self.dispatch(arg)
+            else:
+                try:
+                    candidates = self.table[type(arg)]
+                except KeyError:
+                    candidates = self.dispatch(arg)
+            if candidates is True:
+                return True
+            if candidates is not None:
+                for validator in candidates:
+                    if validator.validate(arg):
+                        return True
+                return False
+
+        # The joint predicate is not evaluated for numpy arrays (its operands evaluate to arrays, which cannot be joined
+        # with and / or): Each validator checks the whole array
+        if self.predicate is not None and not is_ndarray(arg):
+            try:
+                return self.predicate(arg)
+            except Exception:
+                # Validate the argument again with each validator
+                pass
         for validator in self.validators:
             if validator.validate(arg):
                 return True
         return False
 
+    def __getstate__(self):
+        # Compiled validators cannot be pickled (they are compiled again when unpickling)
+        state = self.__dict__.copy()
+        del state['predicate']
+        if state['table'] is not None:
+            state['table'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.predicate = compile_validators(self.validators, ' or ')
+        self.token = get_cache_token()
+
+    def optimize(self):
+        return optimize_composition(self)
+
+    def stats(self):
+        '''
+        Returns the statistics recorded in adaptive mode (see Profile.stats()) or None if this validator is not
+        adaptive.
+        '''
+        return self.profile.stats() if self.profile is not None else None
+
+    async def validate_async(self, arg):
+        for validator in self.validators:
+            if await validator.validate_async(arg):
+                return True
+        return False
+
 
 class ConjunctValidator(Validator):
     '''
@@ -193,7 +808,13 @@ class ConjunctValidator(Validator):
     is composed with
     '''
 
-    def __init__(self, items):
+    def __init__(self, items, adaptive=False):
+        '''
+        Initializes this instance.
+        :param items: The validators (or validator specs) this instance is composed with.
+        :param adaptive: If True, the cost of the validators and how often they decide the result are measured
+        and they are periodically reordered to reject invalid arguments as soon as possible (see stats())
+        '''
         if not _iterable(items):
             raise TypeError()
         validators = tuple([item if isinstance(item, Validator) else Validator.from_spec(item) for item in items])
@@ -201,13 +822,272 @@ class ConjunctValidator(Validator):
             raise ValueError()
 
         self.validators = tuple(validators)
+        self.is_async = any(validator.is_async for validator in validators)
+        self.async_only = any(validator.async_only for validator in validators)
+        self.is_cheap = all(validator.is_cheap for validator in validators)
+        self.is_pure = all(validator.is_pure for validator in validators)
+        self.type_only = all(validator.type_only for validator in validators)
+        self.profile = Profile(self.validators) if adaptive else None
+        self.predicate = compile_validators(self.validators, ' and ')
+
+    def __call__(self, arg):
+        if self.validate(arg):
+            return True
+        # Raise the error of the validator that failed
+        for validator in self.validators:
+            validator(arg)
+        raise Exception(self.error_message(arg))
 
     def validate(self, arg):
+        if self.profile is not None:
+            return self.profile.run(arg, False)
+        # The joint predicate is not evaluated for numpy arrays (its operands evaluate to arrays, which cannot be joined
+        # with and / or): Each validator checks the whole array
+        if self.predicate is not None and not is_ndarray(arg):
+            try:
+                return self.predicate(arg)
+            except Exception:
+                # Validate the argument again with each validator
+                pass
         for validator in self.validators:
             if not validator.validate(arg):
                 return False
         return True
 
+    def __getstate__(self):
+        # Compiled validators cannot be pickled (they are compiled again when unpickling)
+        state = self.__dict__.copy()
+        del state['predicate']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.predicate = compile_validators(self.validators, ' and ')
+
+    def optimize(self):
+        return optimize_composition(self)
+
+    def stats(self):
+        '''
+        Returns the statistics recorded in adaptive mode (see Profile.stats()) or None if this validator is not
+        adaptive.
+        '''
+        return self.profile.stats() if self.profile is not None else None
+
+    async def validate_async(self, arg):
+        for validator in self.validators:
+            if not await validator.validate_async(arg):
+                return False
+        return True
+
+
+class Profile:
+    '''
+    Records the cost of the validators of a composed validator in adaptive mode and how often each one decides the
+    result (a validator that accepts the argument ends the validation of a DisjunctValidator, one that rejects it ends
+    the one of a ConjunctValidator) and periodically reorders them, so that the ones that decide the result more
+    often at a lower cost are tried first.
+    Only validators without side effects (is_pure) are moved: the others keep their position and the validators are
+    never moved across them.
+    '''
+    def __init__(self, validators, sample=8, period=256):
+        '''
+        Initializes this instance.
+        :param validators: The validators of the composed validator (in their initial order)
+        :param sample: Only one of each this number of validations is measured.
+        :param period: Number of measured validations between reorderings.
+        '''
+        self.validators = validators
+        self.indices = tuple(range(0, len(validators)))
+        self.order = validators
+        self.sample, self.period = sample, period
+        self.counter, self.samples, self.reorders = 0, 0, 0
+        self.calls = [0] * len(validators)
+        self.exits = [0] * len(validators)
+        self.time = [0.0] * len(validators)
+
+    def run(self, arg, decisive):
+        '''
+        Validates the given argument with the validators in their current order.
+        :param decisive: The result of a validator that ends the validation (True for disjunctions, False for
+        conjunctions)
+        '''
+        self.counter += 1
+        if self.counter % self.sample != 0:
+            if decisive:
+                for validator in self.order:
+                    if validator.validate(arg):
+                        return True
+                return False
+            for validator in self.order:
+                if not validator.validate(arg):
+                    return False
+            return True
+
+        result = not decisive
+        for index in self.indices:
+            start = perf_counter()
+            valid = self.validators[index].validate(arg)
+            self.time[index] += perf_counter() - start
+            self.calls[index] += 1
+            if bool(valid) == decisive:
+                self.exits[index] += 1
+                result = decisive
+                break
+        self.samples += 1
+        if self.samples >= self.period:
+            self.reorder()
+        return result
+
+    def rank(self, index):
+        '''
+        Returns the expected time spent by the validator at the given index to decide the result once (validators
+        with lower ranks are tried first)
+        '''
+        if self.exits[index] == 0:
+            return float('inf')
+        return self.time[index] / self.exits[index]
+
+    def reorder(self):
+        '''
+        Sorts the validators by their rank (the ones that are not pure are not moved)
+        '''
+        indices, segment = [], []
+        for index in self.indices:
+            if self.validators[index].is_pure:
+                segment.append(index)
+            else:
+                indices.extend(sorted(segment, key=self.rank))
+                indices.append(index)
+                segment = []
+        indices.extend(sorted(segment, key=self.rank))
+        self.indices = tuple(indices)
+        self.order = tuple(self.validators[index] for index in indices)
+
+        # Old measures weigh less, so that the order adapts when the arguments change
+        for index in range(0, len(self.validators)):
+            self.calls[index] //= 2
+            self.exits[index] //= 2
+            self.time[index] /= 2
+        self.samples = 0
+        self.reorders += 1
+
+    def stats(self):
+        '''
+        Returns a list with the statistics of each validator (in the order they are tried now). Each item is a dict
+        with the keys: "validator", "position" (index of the validator in the initial order), "calls" (number of
+        measured calls), "exits" (number of them that decided the result), "exit_rate" and "cost" (mean time per
+        call in seconds). Old measures weigh less after each reordering.
+        '''
+        return [{
+            'validator': self.validators[index],
+            'position': index,
+            'calls': self.calls[index],
+            'exits': self.exits[index],
+            'exit_rate': self.exits[index] / self.calls[index] if self.calls[index] > 0 else None,
+            'cost': self.time[index] / self.calls[index] if self.calls[index] > 0 else None
+        } for index in self.indices]
+
+
+def covers(a, b):
+    '''
+    Returns True if its known that all the arguments valid for the validator b are also valid for the validator a
+    (only type checks and their inversions are compared)
+    '''
+    if a is b or isinstance(a, EmptyValidator):
+        return True
+    if isinstance(a, InvertedValidator) and isinstance(b, InvertedValidator):
+        return covers(b.validator, a.validator)
+    if not isinstance(a, TypeValidator) or type(a).validate is not TypeValidator.validate or \
+            not isinstance(b, TypeValidator):
+        return False
+    # Subclasses of TypeValidator only accept arguments that have the expected types (and check something else)
+    if object in a.types:
+        return True
+    return all(bool in a.types if cls == bool else issubclass(cls, a.types) for cls in b.types)
+
+
+def optimize_composition(validator):
+    '''
+    Returns a simplified version of the given DisjunctValidator or ConjunctValidator instance (see
+    Validator.optimize()). Adaptive validators are not simplified (they reorder their validators by themselves)
+    '''
+    kind = type(validator)
+    if validator.profile is not None:
+        return validator
+
+    validators = []
+    for item in validator.validators:
+        item = item.optimize()
+        if type(item) == kind and item.profile is None:
+            validators.extend(item.validators)
+        else:
+            validators.append(item)
+
+    if kind == DisjunctValidator:
+        # Validators after one that accepts everything are never called
+        empty = next((index for index, item in enumerate(validators) if isinstance(item, EmptyValidator)), None)
+        if empty is not None:
+            if all(item.is_pure for item in validators[:empty]):
+                return validators[empty]
+            validators = validators[:empty+1]
+    else:
+        validators = [item for item in validators if not isinstance(item, EmptyValidator)] or [EmptyValidator()]
+
+    # Drop validators implied by others (only when they have no side effects, because validators are called less times)
+    if all(item.is_pure for item in validators):
+        items = []
+        for item in validators:
+            if kind == DisjunctValidator:
+                if not any(covers(other, item) for other in items):
+                    items = [other for other in items if not covers(item, other)] + [item]
+            elif not any(covers(item, other) for other in items):
+                items = [other for other in items if not covers(other, item)] + [item]
+        validators = items
+
+    if len(validators) == 1:
+        return validators[0]
+    if len(validators) == len(validator.validators) and \
+            all(a is b for a, b in zip(validators, validator.validators)):
+        return validator
+    return kind(validators)
+
+
+def compile_validators(validators, conjunction):
+    '''
+    Compiles a function that validates an input value x with all the given validators at once (joined with the
+    given conjunction: " and " or " or "). Subexpressions shared by expression validators (e.g. arg['price'] in
+    arg['price'] > 0 and arg['price'] < 100) are evaluated only once.
+    The function raises an exception if any expression raises one (then validators must be called separately).
+    :return: Returns the compiled function or None if less than two of the validators are expressions (it would not be
+    any faster) or some of them are asynchronous.
+    '''
+    # Nested validators joined with the same conjunction are compiled together (a & b & c)
+    kind = ConjunctValidator if conjunction == ' and ' else DisjunctValidator
+    while any(isinstance(validator, kind) for validator in validators):
+        validators = [item for validator in validators
+                      for item in (validator.validators if isinstance(validator, kind) else (validator,))]
+
+    operations = [validator.func.optimize() if isinstance(validator, UserValidator) and
+                  isinstance(validator.func, Operation) else None for validator in validators]
+    if sum(operation is not None for operation in operations) < 2 or any(validator.is_async for validator in validators):
+        return None
+
+    compiler = Compiler()
+    for operation in operations:
+        if operation is not None:
+            compiler.count(operation)
+    clauses = [compiler.source(operation) if operation is not None else
+               '{}(x)'.format(compiler.bind(validator.validate)) for validator, operation in zip(validators, operations)]
+    return compiler.build(conjunction.join(clauses))
+
+
+def is_pure(operation):
+    '''
+    Returns True if evaluating the given expression calls no functions (only operators and attributes are evaluated)
+    '''
+    return not isinstance(operation, CallOperation) and all(map(is_pure, operation.operands()))
+
 
 class InvertedValidator(Validator):
     '''
@@ -222,18 +1102,78 @@ class InvertedValidator(Validator):
             validator = item
 
         self.validator = validator
+        self.is_async = validator.is_async
+        self.async_only = validator.async_only
+        self.is_cheap = validator.is_cheap
+        self.is_pure = validator.is_pure
+        self.type_only = validator.type_only
 
     def validate(self, arg):
         if self.validator.validate(arg):
             return False
         return True
 
+    async def validate_async(self, arg):
+        if await self.validator.validate_async(arg):
+            return False
+        return True
+
+    def optimize(self):
+        validator = self.validator.optimize()
+        if isinstance(validator, InvertedValidator):
+            return validator.validator
+        return self if validator is self.validator else InvertedValidator(validator)
+
+
+class XorValidator(Validator):
+    '''
+    This validator is composed by two validators. An input argument is considered valid if its valid for only one of
+    them (each validator is called once)
+    '''
+    def __init__(self, left, right):
+        self.left = left if isinstance(left, Validator) else Validator.from_spec(left)
+        self.right = right if isinstance(right, Validator) else Validator.from_spec(right)
+        self.is_async = self.left.is_async or self.right.is_async
+        self.async_only = self.left.async_only or self.right.async_only
+        self.is_cheap = self.left.is_cheap and self.right.is_cheap
+        self.is_pure = self.left.is_pure and self.right.is_pure
+        self.type_only = self.left.type_only and self.right.type_only
+
+    def validate(self, arg):
+        return (not self.left.validate(arg)) != (not self.right.validate(arg))
+
+    async def validate_async(self, arg):
+        return (not await self.left.validate_async(arg)) != (not await self.right.validate_async(arg))
+
+    def optimize(self):
+        left, right = self.left.optimize(), self.right.optimize()
+        # a ^ True = ~a and ~a ^ ~b = a ^ b
+        if isinstance(right, EmptyValidator):
+            return InvertedValidator(left).optimize()
+        if isinstance(left, EmptyValidator):
+            return InvertedValidator(right).optimize()
+        if isinstance(left, InvertedValidator) and isinstance(right, InvertedValidator):
+            return XorValidator(left.validator, right.validator)
+        return self if left is self.left and right is self.right else XorValidator(left, right)
+
+
+
+# Statistics of the verdicts cache of a TypeValidator
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
 
 
 class TypeValidator(Validator):
     '''
     A validator that checks if the given input arguments has a expected type.
+    If some of the expected types are abstract base classes (e.g. numbers.Number or collections.abc.Mapping), instance
+    checks are slow: The verdicts are cached by the type of the argument (see cache_info())
     '''
+    is_cheap = True
+    is_pure = True
+
+    # Maximum number of types whose verdicts are cached (the cache is cleared when its full)
+    cache_size = 256
+
     def __init__(self, types):
         if not _iterable(types):
             raise Exception()
@@ -246,13 +1186,56 @@ class TypeValidator(Validator):
 
         super().__init__()
         self.types = types
+        self.cache = {} if object not in types and any(isinstance(cls, ABCMeta) for cls in types) else None
+        # Registering new virtual subclasses of an abstract base class changes this token (and the cache is cleared)
+        self.token = get_cache_token()
+        self.hits, self.misses = 0, 0
+        # Subclasses that check something else override validate(). Subclass checks against abstract base classes can
+        # change when new subclasses are registered
+        self.type_only = type(self).validate is TypeValidator.validate and self.cache is None
 
     def validate(self, arg):
         if object in self.types:
             return True
-        if type(arg) == bool:
+        cls = type(arg)
+        if cls == bool:
             return bool in self.types
-        return isinstance(arg, self.types)
+        if self.cache is None or arg.__class__ is not cls:
+            # Objects whose class is not their type (proxies, mocks with specs, ...) are not cached by their type
+            return isinstance(arg, self.types)
+
+        if self.token == get_cache_token():
+            try:
+                verdict = self.cache[cls]
+                self.hits += 1
+                return verdict
+            except KeyError:
+                pass
+        else:
+            self.cache.clear()
+            self.token = get_cache_token()
+        self.misses += 1
+        verdict = isinstance(arg, self.types)
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[cls] = verdict
+        return verdict
+
+    def cache_info(self):
+        '''
+        Returns a named tuple with the number of hits and misses of the verdicts cache, its maximum and current size
+        (like functools.lru_cache) or None if verdicts are not cached (no abstract base classes are expected)
+        '''
+        if self.cache is None:
+            return None
+        return CacheInfo(self.hits, self.misses, self.cache_size, len(self.cache))
+
+    def __getstate__(self):
+        # Tokens are not valid in other processes
+        state = self.__dict__.copy()
+        if state.get('cache') is not None:
+            state['cache'] = {}
+        return state
 
     def error_message(self, arg):
         return 'Type {} expected but got {}'.format(
@@ -265,6 +1248,9 @@ class ValueValidator(Validator):
     '''
     Validator that checks if a given argument takes a discrete value within a set or list of predefined values.
     '''
+    is_cheap = True
+    is_pure = True
+
     def __init__(self, values):
         if not _iterable(values):
             raise TypeError()
@@ -273,6 +1259,18 @@ class ValueValidator(Validator):
             raise ValueError()
 
         super().__init__()
+        # Values indexed by their type and canonical form (the ones that cannot be hashed are not indexed). They are
+        # indexed before removing duplicates: frozenset() would keep only one of 1, 1.0 and True
+        self.index, self.unindexed = {}, []
+        for value in values:
+            try:
+                bucket = self.index.setdefault((type(value), canonical(value)), [])
+            except TypeError:
+                self.unindexed.append(value)
+                continue
+            if value not in bucket:
+                bucket.append(value)
+
         try:
             values = frozenset(values)
         except:
@@ -281,7 +1279,26 @@ class ValueValidator(Validator):
 
     def validate(self, arg):
         cls = type(arg)
-        for value in self.values:
+        try:
+            try:
+                candidates = self.index.get((cls, arg))
+            except TypeError:
+                candidates = self.index.get((cls, canonical(arg)))
+        except TypeError:
+            return self.scan(arg, self.values)
+
+        if candidates is not None:
+            for value in candidates:
+                if arg == value:
+                    return True
+        return self.scan(arg, self.unindexed) if self.unindexed else False
+
+    def scan(self, arg, values):
+        '''
+        Returns True if the given argument is equal to any of the values indicated and have the same type.
+        '''
+        cls = type(arg)
+        for value in values:
             if cls == type(value) and arg == value:
                 return True
         return False
@@ -296,6 +1313,9 @@ class RangeValidator(Validator):
     '''
     Validator that checks if the given argument is of integer type and its within some range
     '''
+    is_cheap = True
+    is_pure = True
+
     def __init__(self, interval):
         if not isinstance(interval, range):
             raise TypeError()
@@ -308,6 +1328,277 @@ class RangeValidator(Validator):
         return 'Value in {} expected but got {}'.format(format_range(self.interval), arg)
 
 
+class IntervalValidator(Validator):
+    '''
+    Validator that checks if the given argument is within an interval (its compared with the bounds of the interval)
+    '''
+    is_cheap = True
+    is_pure = True
+
+    def __init__(self, lower=None, upper=None, lower_closed=True, upper_closed=False):
+        '''
+        Initializes this instance.
+        :param lower: The lower bound of the interval or None if it has no lower bound.
+        :param upper: The upper bound of the interval or None if it has no upper bound.
+        :param lower_closed: True if the lower bound is in the interval.
+        :param upper_closed: True if the upper bound is in the interval.
+        '''
+        self.lower, self.upper = lower, upper
+        self.lower_closed, self.upper_closed = lower_closed, upper_closed
+
+    def validate(self, arg):
+        try:
+            if self.lower is not None and not (arg >= self.lower if self.lower_closed else arg > self.lower):
+                return False
+            return self.upper is None or (arg <= self.upper if self.upper_closed else arg < self.upper)
+        except (TypeError, ArithmeticError):
+            # Not comparable values (or NaN compared with decimals)
+            return False
+
+    def error_message(self, arg):
+        return 'Value in {} expected but got {}'.format(
+            format_interval(self.lower, self.upper, self.lower_closed, self.upper_closed), arg)
+
+
+class IntervalUnionValidator(Validator):
+    '''
+    Validator that checks if the given argument is within any of a set of intervals. Overlapping intervals are merged
+    and arguments are looked up with a binary search.
+    '''
+    is_cheap = True
+    is_pure = True
+
+    def __init__(self, intervals, types=None):
+        '''
+        Initializes this instance.
+        :param intervals: An iterable of IntervalValidator instances or range objects with step 1 (they are
+        equivalent to the interval [start, stop) for int values)
+        :param types: If not None, only arguments whose type is in this set of types are valid. If its not indicated
+        and all the intervals are ranges, its set to int (other types are not valid, like with RangeValidator)
+        '''
+        intervals, bounds = tuple(intervals), []
+        for interval in intervals:
+            if isinstance(interval, range):
+                if interval.step != 1:
+                    raise ValueError('Only ranges with step 1 can be used as intervals')
+                if len(interval) > 0:
+                    bounds.append((interval.start, True, interval.stop, False))
+            elif isinstance(interval, IntervalValidator):
+                bounds.append((
+                    interval.lower if interval.lower is not None else float('-inf'),
+                    interval.lower_closed or interval.lower is None,
+                    interval.upper if interval.upper is not None else float('inf'),
+                    interval.upper_closed or interval.upper is None))
+            else:
+                raise TypeError('Intervals must be ranges or IntervalValidator instances')
+        if types is None and len(bounds) > 0 and all(isinstance(interval, range) for interval in intervals):
+            types = (int,)
+
+        # Sort the intervals by their lower bounds (closed ones first) and merge the ones that overlap
+        merged = []
+        for lower, lower_closed, upper, upper_closed in sorted(bounds, key=lambda bound: (bound[0], not bound[1])):
+            if merged:
+                last = merged[-1]
+                if lower < last[2] or (lower == last[2] and (lower_closed or last[3])):
+                    if upper > last[2] or (upper == last[2] and upper_closed):
+                        merged[-1] = (last[0], last[1], upper, upper_closed)
+                    continue
+            merged.append((lower, lower_closed, upper, upper_closed))
+
+        self.types = frozenset(types) if types is not None else None
+        self.lowers = [bound[0] for bound in merged]
+        self.lower_closed = [bound[1] for bound in merged]
+        self.uppers = [bound[2] for bound in merged]
+        self.upper_closed = [bound[3] for bound in merged]
+
+    def validate(self, arg):
+        if self.types is not None:
+            if type(arg) not in self.types:
+                return False
+        elif is_ndarray(arg):
+            return bool(self.contains(arg).all())
+        try:
+            index = bisect_right(self.lowers, arg) - 1
+            if index < 0 or (arg == self.lowers[index] and not self.lower_closed[index]):
+                return False
+            upper = self.uppers[index]
+            return arg < upper or (arg == upper and self.upper_closed[index])
+        except (TypeError, ArithmeticError):
+            # Not comparable values (or NaN compared with decimals)
+            return False
+
+    def contains(self, values):
+        '''
+        Vectorized version of validate() for numpy arrays (the types of the arguments are not checked)
+        :param values: A numpy array or array-like object with numbers.
+        :return: Returns an array of bools with the same shape indicating which values are within the intervals.
+        '''
+        import numpy as np
+        values = np.asarray(values)
+        # Decimals and large integers are not converted to floats
+        exact = any(isinstance(bound, Decimal) or (isinstance(bound, int) and abs(bound) > 2 ** 53)
+                    for bound in self.lowers + self.uppers)
+        lowers = np.array(self.lowers, dtype=object if exact else None)
+        uppers = np.array(self.uppers, dtype=object if exact else None)
+        lower_closed, upper_closed = np.array(self.lower_closed, dtype=bool), np.array(self.upper_closed, dtype=bool)
+        if len(lowers) == 0:
+            return np.zeros(values.shape, dtype=bool)
+
+        index = np.searchsorted(lowers, values, side='right') - 1
+        valid = index >= 0
+        index = np.maximum(index, 0)
+        lower, upper = lowers[index], uppers[index]
+        valid &= (values > lower) | ((values == lower) & lower_closed[index])
+        valid &= (values < upper) | ((values == upper) & upper_closed[index])
+        return valid.astype(bool)
+
+    def error_message(self, arg):
+        intervals = [format_interval(*bounds) for bounds in
+                     islice(zip(self.lowers, self.uppers, self.lower_closed, self.upper_closed), 0, 6)]
+        if len(self.lowers) > 6:
+            intervals.append('...')
+        return 'Value in {} expected but got {}'.format(' or '.join(intervals) or '{}', arg)
+
+
+class MembershipValidator(Validator):
+    '''
+    Validator that checks if the given argument is equal to any of the values of a set (unlike ValueValidator,
+    arguments don't need to have the same type as the values, e.g. True is equal to 1)
+    '''
+    is_cheap = True
+    is_pure = True
+
+    def __init__(self, values):
+        '''
+        Initializes this instance.
+        :param values: An iterable with the values (they must be hashable)
+        '''
+        self.values = frozenset(values)
+
+    def validate(self, arg):
+        try:
+            return arg in self.values
+        except TypeError:
+            # Unhashable argument
+            return any(arg == value for value in self.values)
+
+    def error_message(self, arg):
+        return 'Value in {} expected but got {}'.format(format_sequence(self.values), arg)
+
+
+class LoweredValidator(Validator):
+    '''
+    Validator for an expression which is equivalent to a native validator (faster than evaluating it) when the type of
+    the argument is within a given domain. e.g: (arg >= 0) & (arg < 256) is equivalent to an interval if the
+    arguments are int or float values.
+    Arguments of other types are validated evaluating the expression. Error messages are the same as for the
+    expression.
+    '''
+    is_cheap = True
+    is_pure = True
+
+    def __init__(self, native, domain, expression):
+        '''
+        Initializes this instance.
+        :param native: The native validator.
+        :param domain: A set of types (the validator is used only for arguments whose type is in it) or None if the
+        native validator is equivalent for arguments of any type.
+        :param expression: The validator of the expression (instance of UserValidator)
+        '''
+        self.native = native
+        self.domain = domain
+        self.expression = expression
+        self.func = expression.func
+
+    def __call__(self, arg):
+        if self.domain is not None and type(arg) not in self.domain:
+            return self.expression(arg)
+        if self.native.validate(arg):
+            return True
+        raise Exception(self.expression.error_message(arg))
+
+    def validate(self, arg):
+        if self.domain is not None and type(arg) not in self.domain:
+            return self.expression.validate(arg)
+        return self.native.validate(arg)
+
+    def error_message(self, arg):
+        return self.expression.error_message(arg)
+
+    def __str__(self):
+        return '{}({})'.format(self.__class__.__name__, self.native)
+
+
+def lower_expression(operation):
+    '''
+    Finds a native validator equivalent to the given expression (see LoweredValidator). The patterns recognized are:
+    - Intervals: Comparisons of the argument and numbers joined with & or all_of() e.g. (arg >= 0) & (arg < 256)
+    - Sets of values: Equality comparisons of the argument and values joined with | or any_of()
+    e.g. (arg == 'a') | (arg == 'b')
+    - Type checks: isinstance_(arg, types)
+    :return: Returns an instance of LoweredValidator or None if the expression doesn't match any of the patterns.
+    '''
+    # Expressions are matched after folding constants and moving them to the right side of comparisons (e.g. 0 < arg
+    # is matched as arg > 0). optimize() keeps the types of the operands: arithmetic identities like arg + 0 are only
+    # removed from numeric operands, so (arg + 0) == 'a' is not matched as arg == 'a' (it raises for 'a')
+    optimized = operation.optimize()
+
+    def terms(operation, conjunction):
+        # Operands of the expression joined with the given conjunction
+        op = Operator.__and__ if conjunction == 'and' else Operator.__or__
+        if isinstance(operation, BinaryOperation) and operation._op is op:
+            return terms(operation._g, conjunction) + terms(operation._h, conjunction)
+        if isinstance(operation, LogicalOperation) and operation._conjunction == conjunction:
+            return [term for item in operation._items for term in terms(item, conjunction)]
+        return [operation]
+
+    def comparison(term, *ops):
+        # Returns the operator and the constant of the comparison x op k or None if the term is not like that
+        if isinstance(term, BinaryOperation) and any(term._op is op for op in ops) and \
+                isinstance(term._g, Identity) and isinstance(term._h, Constant):
+            return term._op, term._h._k
+        return None
+
+    # Intervals
+    numbers = (int, float, bool)
+    comparisons = [comparison(term, Operator.__lt__, Operator.__le__, Operator.__gt__, Operator.__ge__)
+                   for term in terms(optimized, 'and')]
+    if None not in comparisons and all(type(k) in numbers and k == k for op, k in comparisons):
+        lower, upper, lower_closed, upper_closed = None, None, True, True
+        for op, k in comparisons:
+            if op is Operator.__gt__ or op is Operator.__ge__:
+                closed = op is Operator.__ge__
+                if lower is None or k > lower or (k == lower and not closed):
+                    lower, lower_closed = k, closed
+            else:
+                closed = op is Operator.__le__
+                if upper is None or k < upper or (k == upper and not closed):
+                    upper, upper_closed = k, closed
+        return LoweredValidator(IntervalValidator(lower, upper, lower_closed, upper_closed), frozenset(numbers),
+                                UserValidator(operation))
+
+    # Sets of values
+    scalars = (str, bytes, int, float, complex, bool, type(None))
+    comparisons = [comparison(term, Operator.__eq__) for term in terms(optimized, 'or')]
+    if None not in comparisons and all(type(k) in scalars and k == k for op, k in comparisons):
+        return LoweredValidator(MembershipValidator(k for op, k in comparisons), frozenset(scalars),
+                                UserValidator(operation))
+
+    # Type checks
+    if isinstance(optimized, CallOperation) and optimized._func is isinstance and len(optimized._args) == 2 and \
+            not optimized._kwargs and isinstance(optimized._args[0], Identity) and \
+            isinstance(optimized._args[1], Constant):
+        types = optimized._args[1]._k
+        types = types if isinstance(types, tuple) else (types,)
+        if len(types) > 0 and all(map(isclass, types)):
+            # TypeValidator only matches bool values if bool is one of the types
+            if any(issubclass(bool, cls) for cls in types):
+                types += (bool,)
+            return LoweredValidator(TypeValidator(types), None, UserValidator(operation))
+
+    return None
+
+
 class MatchRegexValidator(TypeValidator):
     '''
     Validator that checks if input arguments are strings and also matches some regex pattern.
@@ -350,6 +1641,9 @@ class IterableValidator(Validator):
     '''
     Validator that checks if the given argument is iterable or not.
     '''
+    is_cheap = True
+    is_pure = True
+
     def validate(self, arg):
         return _iterable(arg)
 
@@ -361,6 +1655,10 @@ class CallableValidator(Validator):
     '''
     Validator that checks if the given argument is callable or not
     '''
+    is_cheap = True
+    is_pure = True
+    type_only = True
+
     def validate(self, arg):
         return callable(arg)
 
@@ -372,6 +1670,9 @@ class HashableValidator(Validator):
     '''
     Validator that checks if the given argument is hashable or not (if it implements the method __hash__)
     '''
+    is_cheap = True
+    is_pure = True
+
     def validate(self, arg):
         return _hashable(arg)
 
@@ -504,6 +1805,8 @@ class NdarrayValidator(TypeValidator):
 # Validator aliases and singletons
 
 matchregex = MatchRegexValidator
+interval = IntervalValidator
+batch = BatchValidator
 fullmatchregex = FullMatchRegexValidator
 
 iterable = IterableValidator()
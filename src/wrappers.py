@@ -3,11 +3,54 @@
 This module includes the definition of the class Wrapper
 '''
 
-from .processors import ProcessorBundle
+from .processors import ProcessorBundle, Sampler, ValidateInput
+from .codegen import compile_caller, compile_binder, missing
+from .exceptions import ParsingError
 from functools import update_wrapper
-from inspect import signature, Parameter
+from itertools import islice, repeat
+from operator import is_
+from inspect import signature, Parameter, iscoroutinefunction, isasyncgenfunction
 from .utils import iterable
 from types import MethodType
+from weakref import WeakSet
+from asyncio import gather, wait, ensure_future, FIRST_EXCEPTION
+from os import environ
+
+
+# Its False if validation is disabled for all the wrappers. Its initial value can be changed setting the environment
+# variable VPFARGS_VALIDATION to "0", "off", "false" or "no"
+validation = environ.get('VPFARGS_VALIDATION', '').strip().lower() not in ('0', 'off', 'false', 'no')
+
+# All the wrappers created (their callers must be built again when validation is enabled or disabled)
+wrappers = WeakSet()
+
+
+def validation_enabled():
+    '''
+    Returns True if validation is enabled globally, False otherwise.
+    '''
+    return validation
+
+def enable_validation():
+    '''
+    Enables validation for all the wrappers (except the ones where it was disabled with FuncWrapper.disable_validation())
+    '''
+    set_validation(True)
+
+def disable_validation():
+    '''
+    Disables validation for all the wrappers. Parsers are still applied to the input arguments.
+    '''
+    set_validation(False)
+
+def set_validation(enabled):
+    '''
+    Enables or disables validation for all the wrappers.
+    '''
+    global validation
+    validation = bool(enabled)
+    for wrapper in tuple(wrappers):
+        wrapper.caller = None
 
 
 class FuncWrapper(ProcessorBundle):
@@ -15,6 +58,9 @@ class FuncWrapper(ProcessorBundle):
     An instance of this class encapsulates a method:
     When invoked, It can process input argument values before calling the wrapped method.
     '''
+    # Maximum number of tuples of types stored in the type cache (see build_type_cache())
+    type_cache_size = 8
+
     def __init__(self, func):
         '''
         Initializes this instance.
@@ -31,9 +77,171 @@ class FuncWrapper(ProcessorBundle):
             default=InputValueWrapper(param.default, validate=False, parse=False) if param.default != Parameter.empty else param.default)
             for param in s.parameters.values()])
         self.signature = s
+        self.caller = None
+        # Tuples of types of valid arguments (see build_type_cache())
+        self.type_cache = None
+        wrappers.add(self)
 
         update_wrapper(self, func) # This method sets some attributes to introspect the wrapper object like __qualname__
 
+        # Coroutine functions and asynchronous generator functions: Calling the wrapper processes the arguments (errors
+        # are raised before the coroutine or generator is created) and returns what the wrapped function returns.
+        self.is_coroutine = iscoroutinefunction(func)
+        self.is_async_generator = isasyncgenfunction(func)
+        # If True, when an asynchronous validator fails the others are cancelled
+        self.cancel_on_failure = False
+        if self.is_coroutine or self.is_async_generator:
+            # These attributes make inspect.iscoroutinefunction() and inspect.isasyncgenfunction() (and
+            # asyncio.iscoroutinefunction()) return True for this wrapper.
+            code = func
+            while code is not None and not hasattr(code, '__code__'):
+                # Methods, partial objects and other function wrappers
+                code = getattr(code, '__wrapped__', None) or getattr(code, '__func__', None) or getattr(code, 'func', None)
+            if code is not None:
+                self.__code__ = code.__code__
+                self.__defaults__, self.__kwdefaults__ = code.__defaults__, code.__kwdefaults__
+
+    @property
+    def validation_enabled(self):
+        return self.validation and validation
+
+    def enable_validation(self):
+        '''
+        Enables validation of the input arguments for this wrapper (it has no effect if validation is disabled globally)
+        '''
+        self.validation = True
+        self.caller = None
+
+    def disable_validation(self):
+        '''
+        Disables validation of the input arguments for this wrapper. Parsers are still applied.
+        If there are no parsers, calling the wrapper is equivalent to call the wrapped function.
+        '''
+        self.validation = False
+        self.caller = None
+
+    def append(self, processor):
+        if isinstance(processor, ValidateInput) and not self.is_coroutine and \
+                any(validator.async_only for validator in processor.validators):
+            raise TypeError('Asynchronous validators can only validate arguments of coroutine functions')
+        super().append(processor)
+        # The specialized call function must be generated again
+        self.caller = None
+
+    def sample_validation(self, rate, random=False):
+        '''
+        Sets the sampling policy of this wrapper: Only a fraction of the calls will be validated. Parsers are applied
+        on every call. Validators indicated with a specific sample rate (validate(..., sample=...)) are not affected.
+        :param rate: Fraction of the calls to validate (a number in the range (0, 1]) or None to validate all the calls.
+        :param random: If True, calls are chosen randomly. Otherwise one of every round(1 / rate) calls is validated.
+        '''
+        self.sampler = Sampler(rate, random) if rate is not None else None
+        self.caller = None
+
+    def get_chains(self):
+        '''
+        Returns the chains of stages applied to the arguments on each call (see ProcessorBundle.fuse()). Validation
+        stages are excluded if validation is disabled.
+        '''
+        chains = self.chains
+        if chains is not None and not self.validation_enabled:
+            chains = tuple(tuple(stage for stage in chain if not stage.validates) for chain in chains)
+        return chains
+
+    def build_caller(self):
+        '''
+        Builds the function invoked when this wrapper is called. By default, a function with the same signature as the
+        wrapped function is generated (see compile_caller()). If thats not possible, call_generic() is used instead.
+        :return:
+        '''
+        chains = self.get_chains()
+        self.type_cache = None
+        if chains is not None and not any(chains):
+            return self.wrapped_func
+        if chains is not None and self.is_coroutine and any(stage.is_async for chain in chains for stage in chain):
+            return self.call_async
+        caller = self.build_parallel_caller(chains)
+        if caller is not None:
+            return caller
+        caller = compile_caller(self, chains, self.build_type_cache(chains))
+        if caller is None:
+            self.type_cache = None
+            return self.call_generic
+        return caller
+
+    def build_type_cache(self, chains):
+        '''
+        Creates the cache of the types of the arguments known to be valid used by the generated caller, if all the
+        stages validate the arguments with validators whose result depend only on the type of the arguments (e.g.
+        validate(int, str, [float, bool])). Calls with arguments of the same types as a previous valid call are not
+        validated again. Its only used if there are no parsers and validation is not sampled.
+        :return: Returns an empty set where the generated caller stores the tuples of types of the arguments or None
+        '''
+        if chains is not None and all(stage.validates and stage.item.type_only and
+                                      self.get_sampler(stage.processor) is None for chain in chains for stage in chain):
+            self.type_cache = set()
+        else:
+            self.type_cache = None
+        return self.type_cache
+
+    def build_parallel_caller(self, chains):
+        '''
+        Builds the function invoked when this wrapper is called if the validators of more than one argument are
+        expensive and they can run in parallel (see validate(..., executor=...)). The chains of those arguments are
+        applied in the executor and the rest in the current thread.
+        If an argument is not valid, the exception raised refers to the one with the lowest index.
+        :return: Returns the function or None if arguments must be processed serially.
+        '''
+        binder = compile_binder(self)
+        if chains is None or binder is None or len(chains) != len(self.signature.parameters):
+            return None
+
+        # The executor used to process each argument (or None)
+        executors = []
+        for chain in chains:
+            stages = [stage for stage in chain
+                      if stage.validates and stage.processor.executor is not None and not stage.item.is_cheap]
+            executors.append(stages[0].processor.executor if stages else None)
+        if len([executor for executor in executors if executor is not None]) < 2:
+            return None
+
+        func, plan = self.wrapped_func, tuple(zip(chains, executors))
+        defaults = [(index, param.default.wrapped_value) for index, param in enumerate(self.signature.parameters.values())
+                    if param.default is not Parameter.empty]
+
+        def process(chain, arg):
+            for stage in chain:
+                arg = stage(arg)
+            return arg
+
+        def call(*args, **kwargs):
+            args = list(binder(*args, **kwargs))
+            skipped = self.sampled_out()
+            if skipped:
+                chains = [tuple(stage for stage in chain if stage.processor not in skipped) for chain, executor in plan]
+            else:
+                chains = [chain for chain, executor in plan]
+
+            futures = [executor.submit(process, chain, arg) if executor is not None and arg is not missing else None
+                       for (ignored, executor), chain, arg in zip(plan, chains, args)]
+            try:
+                for index, (chain, future) in enumerate(zip(chains, futures)):
+                    if future is not None:
+                        args[index] = future.result()
+                    elif args[index] is not missing:
+                        args[index] = process(chain, args[index])
+            finally:
+                for future in futures:
+                    if future is not None:
+                        future.cancel()
+
+            for index, default in defaults:
+                if args[index] is missing:
+                    args[index] = default
+            return func(*args)
+
+        return update_wrapper(call, func)
+
     def call_wrapped(self, *args, **kwargs):
         '''
         Calls the wrapped function with the given arguments.
@@ -59,12 +267,194 @@ class FuncWrapper(ProcessorBundle):
         :return: Returns what the wrapped function outputs but before that, those values will be processed using the method
         process_output()
         '''
+        caller = self.caller
+        if caller is None:
+            caller = self.caller = self.build_caller()
+        return caller(*args, **kwargs)
+
+    def call_generic(self, *args, **kwargs):
+        '''
+        Processes the input arguments binding them to the signature of the wrapped function and then calls it.
+        This is used instead of the generated function when it cannot be built.
+        '''
         bounded_args = self.signature.bind(*args, **kwargs)
         bounded_args.apply_defaults()
 
         args = bounded_args.args
         return self.call_wrapped(*self.process_input(*args))
 
+    def call_async(self, *args, **kwargs):
+        '''
+        This is called instead of the generated function when the wrapped function is a coroutine function and some of
+        its validators are asynchronous.
+        The stages of each argument are applied until the first asynchronous validator. The rest of them are
+        applied in the returned coroutine, concurrently for all the arguments (using asyncio.gather()). Then the wrapped
+        function is awaited.
+        '''
+        bounded_args = self.signature.bind(*args, **kwargs)
+        bounded_args.apply_defaults()
+        args = list(bounded_args.args)
+
+        skipped = self.sampled_out()
+        pending = []
+        for index, chain in enumerate(self.get_chains()):
+            chain = tuple(stage for stage in chain if not stage.validates or stage.processor not in skipped)
+            for position, stage in enumerate(chain):
+                if stage.is_async:
+                    pending.append((index, chain[position:]))
+                    break
+                args[index] = stage(args[index])
+        return self.await_wrapped(args, pending)
+
+    async def await_wrapped(self, args, pending):
+        '''
+        Applies the given pending stages to the arguments and awaits the wrapped function (see call_async())
+        :param args: List of input arguments.
+        :param pending: List of tuples (index, stages) with the stages to apply to each argument.
+        '''
+        async def process(index, chain):
+            arg = args[index]
+            for stage in chain:
+                arg = await stage.call_async(arg)
+            args[index] = arg
+
+        if len(pending) == 1:
+            await process(*pending[0])
+        elif not self.cancel_on_failure:
+            # The first argument that fails is reported
+            for result in await gather(*[process(index, chain) for index, chain in pending], return_exceptions=True):
+                if isinstance(result, BaseException):
+                    raise result
+        elif len(pending) > 0:
+            tasks = [ensure_future(process(index, chain)) for index, chain in pending]
+            try:
+                done, others = await wait(tasks, return_when=FIRST_EXCEPTION)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            for task in tasks:
+                if task in done and task.exception() is not None:
+                    raise task.exception()
+
+        return await self.call_wrapped(*[arg if not isinstance(arg, InputValueWrapper) else arg.wrapped_value
+                                         for arg in args])
+
+    def map(self, *iterables, chunksize=1024):
+        '''
+        Calls the wrapped function with arguments taken from each of the given iterables (like the builtin map). See
+        starmap()
+        '''
+        return self.starmap(zip(*iterables), chunksize)
+
+    def starmap(self, iterable, chunksize=1024):
+        '''
+        Calls the wrapped function once for each tuple of positional arguments of the given iterable (like
+        itertools.starmap).
+        Rows of arguments are processed by chunks: Each validator or parser is applied at once to all the values that an
+        argument takes in the chunk (a column) before calling the wrapped function for each row.
+        :param iterable: An iterable of tuples of positional arguments.
+        :param chunksize: Maximum number of rows processed at once.
+        :return: Returns a generator which yields the values returned by the wrapped function for each row.
+        If an argument is not valid or cannot be parsed, ValidationError or ParsingError is raised after calling the
+        wrapped function for the previous rows. The exception indicates the index of the row (starting with 0) in its
+        attribute "row".
+        '''
+        if not isinstance(chunksize, int):
+            raise TypeError('chunksize must be an int value')
+        if chunksize < 1:
+            raise ValueError('chunksize must be greater or equal than 1')
+
+        binder, chains = compile_binder(self), self.get_chains()
+        if binder is None or chains is None or (len(chains) != len(self.signature.parameters) and self.processors):
+            return self.starmap_generic(iterable)
+        return self.starmap_columns(iterable, chunksize, binder, chains)
+
+    def starmap_generic(self, iterable):
+        '''
+        Its the same as starmap() but arguments are processed row by row (used when the wrapper cannot be specialized)
+        '''
+        for row, args in enumerate(iterable):
+            bounded_args = self.signature.bind(*args)
+            bounded_args.apply_defaults()
+            try:
+                args = self.process_input(*bounded_args.args)
+            except ParsingError as e:
+                e.row = row
+                raise e
+            yield self.call_wrapped(*args)
+
+    def starmap_columns(self, iterable, chunksize, binder, chains):
+        '''
+        Implementation of starmap(). binder must be the function generated by compile_binder() for this wrapper and
+        chains the stages applied to each argument.
+        '''
+        func = self.wrapped_func
+        defaults = [(index, param.default.wrapped_value) for index, param in enumerate(self.signature.parameters.values())
+                    if param.default is not Parameter.empty]
+        samplers = frozenset(self.get_sampler(stage.processor) for chain in chains for stage in chain) - {None}
+        # Rows with all the arguments are not bound. Only arguments with default values can be missing
+        size, optional = len(self.signature.parameters), frozenset(index for index, default in defaults)
+
+        rows, offset = iter(iterable), 0
+        while True:
+            chunk = list(islice(rows, chunksize))
+            if not chunk:
+                return
+            if frozenset(map(len, chunk)) != {size}:
+                chunk = [binder(*args) for args in chunk]
+
+            # Process the chunk column by column. If a row fails, the next ones are discarded.
+            columns = [list(column) for column in zip(*chunk)]
+            masks = {sampler: [sampler() for args in chunk] for sampler in samplers}
+            limit, error = len(chunk), None
+            for column, chain in zip(columns, chains):
+                for stage in chain:
+                    item, validates, mask = stage.item, stage.validates, masks.get(self.get_sampler(stage.processor))
+                    if validates and mask is None:
+                        # The whole column is validated at once
+                        values, present = column[:limit], None
+                        if stage.index in optional and any(map(is_, values, repeat(missing))):
+                            present = [row for row, value in enumerate(values) if value is not missing]
+                            values = [values[row] for row in present]
+                        index = item.validate_column(values)
+                        if index is not None:
+                            row = present[index] if present is not None else index
+                            try:
+                                item(column[row])
+                                cause = Exception(item.error_message(column[row]))
+                            except Exception as e:
+                                cause = e
+                            error, limit = stage.error(cause), row
+                            error.row = offset + row
+                        continue
+
+                    for row in range(0, limit):
+                        value = column[row]
+                        if value is missing or (mask is not None and not mask[row]):
+                            continue
+                        try:
+                            if validates:
+                                item(value)
+                            else:
+                                column[row] = item(value)
+                        except Exception as e:
+                            error, cause, limit = stage.error(e), e, row
+                            error.row = offset + row
+                            break
+
+            for index, default in defaults:
+                column = columns[index]
+                if any(map(is_, column, repeat(missing))):
+                    for row in range(0, limit):
+                        if column[row] is missing:
+                            column[row] = default
+
+            # The wrapped function is called by map() (without resuming this generator for each row)
+            yield from islice(map(func, *columns) if columns else (func() for args in chunk), limit)
+            if error is not None:
+                raise error from cause
+            offset += len(chunk)
+
     def process_input(self, *args):
         args = super().process_input(*args)
         return tuple([arg if not isinstance(arg, InputValueWrapper) else arg.wrapped_value for arg in args])
@@ -2,8 +2,12 @@
 
 import unittest
 from unittest import TestCase
+import asyncio
+from inspect import iscoroutinefunction, isasyncgenfunction
 
 from src.decorators import validate, parse, FuncWrapper
+from src.exceptions import ValidationError, ParsingError
+from src.wrappers import enable_validation, disable_validation, validation_enabled
 
 
 class TestDecorators(TestCase):
@@ -295,5 +299,294 @@ class TestDecorators(TestCase):
             def qux(a, b, c, d):
                 pass
 
+    def test_generated_caller(self):
+        '''
+        Checks that the function generated to call the wrapper binds and processes the arguments in the same way as
+        the generic path (which uses the wrapped function signature to bind the arguments)
+        :return:
+        '''
+        @parse(None, str, None)
+        @validate(int, str, float)
+        def foo(x, y, z=1):
+            return x, y, z
+
+        self.assertEqual(foo(1, 2), (1, '2', 1))
+        self.assertEqual(foo(1, y=2, z=2.0), (1, '2', 2.0))
+        self.assertEqual(foo(z=2.0, y=2, x=1), foo.call_generic(1, 2, 2.0))
+        self.assertEqual(foo.caller.__name__, 'foo')
+
+        for args, kwargs in (((1, 'a', 2.0), {'x': 1}), ((), {'y': 2}), ((1, 2, 3.0, 4), {})):
+            with self.assertRaises(TypeError):
+                foo.call_generic(*args, **kwargs)
+            with self.assertRaises(TypeError):
+                foo(*args, **kwargs)
+
+        for call in (foo, foo.call_generic):
+            with self.assertRaises(ValidationError) as context:
+                call(1, 2, None)
+            self.assertEqual(str(context.exception),
+                             'Invalid argument at position 3: Type float expected but got NoneType (at level 2)')
+
+        @parse(int, int)
+        def bar(x, y, /):
+            return x + y
+
+        self.assertEqual(bar('1', '2'), 3)
+        with self.assertRaises(TypeError):
+            bar(x='1', y='2')
+        with self.assertRaises(ParsingError) as context:
+            bar('1', 'a')
+        self.assertIsNone(context.exception.level)
+
+        # Decorating the wrapper again rebuilds the generated function
+        bar = validate(str, str)(bar)
+        with self.assertRaises(ValidationError):
+            bar(1, 2)
+
+        # Parameters can have the names of the builtins used by the generated code
+        @validate(int)
+        def qux(Exception):
+            return Exception
+
+        self.assertEqual(qux(1), 1)
+        with self.assertRaises(ValidationError):
+            qux('a')
+
+    def test_fusion(self):
+        '''
+        Checks that stacked decorators are fused in one chain of stages per argument, without the stages that leave
+        the arguments unchanged.
+        :return:
+        '''
+        class Qux:
+            @parse(None, int, None)
+            @validate(object, int, [1, 2])
+            @parse(None, None, float)
+            def foo(self, x, y):
+                return x, y
+
+        chains = Qux.foo.chains
+        self.assertEqual([len(chain) for chain in chains], [0, 2, 2])
+        self.assertEqual([stage.level for stage in chains[1]], [0, 1])
+        self.assertEqual([stage.validates for stage in chains[2]], [True, False])
+        self.assertEqual(Qux().foo('1', 2), (1, 2.0))
+
+        with self.assertRaises(ParsingError) as context:
+            Qux().foo('a', 2)
+        self.assertEqual(context.exception.level, 0)
+
+        with self.assertRaises(ValidationError) as context:
+            Qux().foo(1, 3)
+        self.assertEqual(str(context.exception), 'Invalid argument at position 3: Value in [1, 2] expected but got 3 (at level 2)')
+
+        # The generic path uses the same chains
+        self.assertEqual(Qux.foo.call_generic(Qux(), '1', 1), (1, 1.0))
+        with self.assertRaises(ValidationError):
+            Qux.foo.call_generic(Qux(), '1', 3)
+
+    def test_disable_validation(self):
+        '''
+        Checks that validation can be disabled globally or for a single wrapper, and enabled again later.
+        Parsers are applied anyway.
+        :return:
+        '''
+        def foo(x, y):
+            return x, y
+        bar = validate(int, int)(foo)
+        qux = parse(int, None)(validate(int, int)(foo))
+
+        bar.disable_validation()
+        self.assertFalse(bar.validation_enabled)
+        self.assertEqual(bar('a', 'b'), ('a', 'b'))
+        self.assertIs(bar.caller, foo)
+        with self.assertRaises(ValidationError):
+            qux(1, 'b')
+
+        bar.enable_validation()
+        with self.assertRaises(ValidationError):
+            bar('a', 'b')
+
+        self.assertTrue(validation_enabled())
+        disable_validation()
+        try:
+            self.assertFalse(validation_enabled())
+            self.assertEqual(bar('a', 'b'), ('a', 'b'))
+            self.assertEqual(qux('1', 'b'), (1, 'b'))
+            self.assertEqual(qux.call_generic('1', 'b'), (1, 'b'))
+            with self.assertRaises(ParsingError):
+                qux('a', 'b')
+        finally:
+            enable_validation()
+
+        with self.assertRaises(ValidationError):
+            bar('a', 'b')
+        with self.assertRaises(ValidationError):
+            qux('1', 'b')
+
+    def test_map(self):
+        '''
+        Checks that a decorated function can be called over many rows of arguments with map() and starmap()
+        :return:
+        '''
+        @parse(None, int, None)
+        @validate(int, object, [1, 2])
+        def foo(x, y, z=1):
+            return x + y + z
+
+        self.assertEqual(list(foo.starmap([(1, '2'), (2, '3', 2)], chunksize=1)), [4, 7])
+        self.assertEqual(list(foo.map(range(0, 5), map(str, range(0, 5)))), [1, 3, 5, 7, 9])
+
+        results = foo.starmap([(1, '2')] * 5 + [(1, '2', 3), (1, 'a')], chunksize=4)
+        self.assertEqual([next(results) for k in range(0, 5)], [4] * 5)
+        with self.assertRaises(ValidationError) as context:
+            next(results)
+        self.assertEqual(context.exception.row, 5)
+        self.assertEqual(str(context.exception), 'Invalid argument at position 3 of row 6: Value in [1, 2] expected but got 3 (at level 2)')
+
+        with self.assertRaises(ParsingError) as context:
+            list(foo.starmap([(1, '2'), ('a', 'b'), (1, 'c')]))
+        self.assertEqual(context.exception.row, 1)
+        self.assertEqual(str(context.exception), 'Invalid argument at position 1 of row 2: Type int expected but got str (at level 2)')
+
+        with self.assertRaises(TypeError):
+            list(foo.starmap([(1,)]))
+
+        # Functions with keyword only parameters are processed row by row
+        @parse(int)
+        def bar(x, *, y=1):
+            return x + y
+        self.assertEqual(list(bar.starmap([('1',), ('2',)])), [2, 3])
+        with self.assertRaises(ParsingError) as context:
+            list(bar.starmap([('1',), ('a',)]))
+        self.assertEqual(context.exception.row, 1)
+
+        # Columns are validated at once: the error refers to the first invalid row
+        from src.operations import arg
+        calls = []
+        def positive(x):
+            calls.append(x)
+            return x > 0
+
+        @validate([int, str], arg >= 0, positive)
+        def qux(x, y, z=1):
+            return x
+
+        self.assertEqual(list(qux.starmap([(1, 2), ('a', 0.5, 3), (2, 1)])), [1, 'a', 2])
+        self.assertEqual(calls, [3])
+        for rows, row, position in (([(1, 0), ('a', 0), (1.5, 0), (None, 0)], 2, 0),
+                                    ([(1, 0), (1, 2), (1, -1), (1, -2)], 2, 1),
+                                    ([(1, 0, 1), (1, 0, -1), (1, 0, 2)], 1, 2)):
+            with self.assertRaises(ValidationError) as context:
+                list(qux.starmap(rows))
+            self.assertEqual(context.exception.row, row)
+            self.assertIn('position {} of row {}'.format(position + 1, row + 1), str(context.exception))
+
+        # Objects that can report other classes are validated one by one
+        from unittest import mock
+        self.assertEqual(len(list(qux.starmap([(mock.Mock(spec=int), 0), (mock.Mock(spec=str), 0)]))), 2)
+        with self.assertRaises(ValidationError) as context:
+            list(qux.starmap([(mock.Mock(spec=int), 0), (mock.Mock(spec=float), 0)]))
+        self.assertEqual(context.exception.row, 1)
+
+    def test_coroutines(self):
+        '''
+        Checks that coroutine functions and asynchronous generator functions can be decorated. Arguments are processed
+        before the coroutine or generator is created.
+        :return:
+        '''
+        @parse(None, int)
+        @validate(str, int)
+        async def foo(x, y):
+            await asyncio.sleep(0)
+            return x * y
+
+        class Qux:
+            @validate(object, int)
+            async def bar(self, n):
+                for k in range(0, n):
+                    yield k
+
+        self.assertTrue(iscoroutinefunction(foo))
+        self.assertTrue(asyncio.iscoroutinefunction(foo))
+        self.assertTrue(isasyncgenfunction(Qux.bar))
+        self.assertTrue(isasyncgenfunction(Qux().bar))
+        self.assertFalse(iscoroutinefunction(Qux().bar))
+
+        async def main():
+            results = [await foo('a', '2')]
+            async for k in Qux().bar(3):
+                results.append(k)
+            return results
+        self.assertEqual(asyncio.run(main()), ['aa', 0, 1, 2])
+
+        with self.assertRaises(ValidationError):
+            foo(1, 2)
+        with self.assertRaises(ValidationError):
+            Qux().bar('3')
+
+    def test_type_cache(self):
+        '''
+        Checks that calls whose arguments have the same types as a previous valid call are not validated again when
+        all the validators only check types.
+        :return:
+        '''
+        from src.validators import Str
+        from src.codegen import missing
+        from src.operations import arg
+        from numbers import Number
+
+        @validate(int, Str | bytes, [float, bool])
+        def foo(x, y, z=None):
+            return x
+
+        self.assertEqual(foo(1, 'a', 1.5), 1)
+        self.assertEqual(foo(2, b'b'), 2)
+        self.assertEqual(foo.type_cache, {(int, str, float), (int, bytes, type(missing))})
+        with self.assertRaises(ValidationError):
+            foo(1, 'a', 'b')
+        with self.assertRaises(ValidationError):
+            foo(True, 'a', 1.5)
+        self.assertEqual(len(foo.type_cache), 2)
+
+        # Disabling validation or adding processors drops the cache
+        foo.disable_validation()
+        self.assertEqual(foo('a', 1, 1), 'a')
+        self.assertIsNone(foo.type_cache)
+        foo.enable_validation()
+        with self.assertRaises(ValidationError):
+            foo('a', 1, 1)
+        self.assertEqual(foo.type_cache, set())
+
+        # The cache is bounded
+        foo.type_cache_size = 2
+        foo.disable_validation()
+        foo.enable_validation()
+        for args in ((1, 'a'), (1, b'a'), (1, 'a', True), (1, 'a', 1.0)):
+            self.assertEqual(foo(*args), 1)
+        self.assertEqual(foo.type_cache, {(int, str, type(missing)), (int, bytes, type(missing))})
+
+        # Types of objects that can report other classes (proxies, mocks with specs) are not cached
+        from unittest import mock
+        @validate(int)
+        def qux(x):
+            return x
+        self.assertIsInstance(qux(mock.Mock(spec=int)), mock.Mock)
+        self.assertEqual(qux.type_cache, set())
+
+        # Parameters can have the names of the builtins used to update the cache
+        @validate(int, int, int, int)
+        def quux(len, any, map, type):
+            return len + any + map + type
+
+        self.assertEqual(quux(1, 2, 3, 4), 10)
+        self.assertEqual(quux.type_cache, {(int, int, int, int)})
+        with self.assertRaises(ValidationError):
+            quux(1, 2, 3, 'a')
+
+        # Validators that depend on values, parsers, sampled validation and abstract base classes are not cached
+        for bar in (validate(int, arg > 0)(lambda x, y: x), parse(int)(validate(str)(lambda x: x)),
+                    validate(int, sample=0.5)(lambda x: x), validate(Number)(lambda x: x)):
+            self.assertIsNone(bar.build_type_cache(bar.get_chains()))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -117,6 +117,225 @@ class TestPlaceholder(TestCase):
         self.assertEqual(expr(-1), -1!=0)
 
 
+    def test_compile(self):
+        '''
+        Compile expressions into Python functions
+        :return:
+        '''
+        from src.operations import Operation, compile_source
+
+        exprs = [
+            (arg > 0) & (arg < 100), abs(-arg + 3) // 2, arg ** 2 % 7 == 1, (~arg | 4) ^ (arg << 1 >> 2),
+            arg * 1.5 - arg / 4, arg, arg - arg
+        ]
+        for expr in exprs:
+            func = expr.compile()
+            for x in range(-200, 200, 7):
+                self.assertEqual(func(x), expr(x))
+
+        func = (arg[1] + arg[0:2][0]).compile()
+        self.assertEqual(func('abc'), 'ba')
+
+        # Subclasses of Operation without source code are called by the compiled function
+        class Double(Operation):
+            def __call__(self, x):
+                return 2 * x
+
+        self.assertEqual((Double('2*x') + 1).compile()(5), 11)
+
+        # Operators defined by the user are compiled as calls to their functions
+        from src.operations import BinaryOperator, UnaryOperator, BinaryOperation, UnaryOperation
+        plus = BinaryOperator('plus', lambda a, b: a + b)
+        twice = UnaryOperator('twice ', lambda a: 2 * a)
+        expr = UnaryOperation(twice, BinaryOperation(plus, arg, 1))
+        self.assertEqual(str(expr), 'twice (x plus 1)')
+        self.assertEqual(expr.compile()(4), 10)
+
+        # Expressions with the same structure share the same code
+        compile_source.cache_clear()
+        a, b = (arg + 1 > 2).compile(), (arg + 10 > 20).compile()
+        self.assertIs(a.__code__, b.__code__)
+        self.assertEqual(compile_source.cache_info().misses, 1)
+        self.assertEqual((a(1), a(2), b(10), b(11)), (False, True, False, True))
+
+
+    def test_optimize(self):
+        '''
+        Simplify expressions before compiling them
+        :return:
+        '''
+        from src.operations import Constant, BinaryOperation, UnaryOperation, CallOperation, Operator, len_
+        from src.validators import Validator
+
+        expr = Constant(60) * Constant(60) * len_(arg) + 0
+        optimized = expr.optimize()
+        self.assertEqual(str(optimized), str(expr))
+        self.assertIsInstance(optimized, BinaryOperation)
+        self.assertIs(optimized._op, Operator.__mul__)
+        self.assertEqual(optimized._g._k, 3600)
+        self.assertIsInstance(optimized._h, CallOperation)
+
+        for expr in (-(-len_(arg)), ~(~len_(arg)), len_(arg) * 1 - 0, Constant(1) * (Constant(0) + len_(arg)) ** 1):
+            self.assertIsInstance(expr.optimize(), CallOperation)
+            self.assertEqual(str(expr.optimize()), str(expr))
+        self.assertIs(arg.optimize(), arg)
+        self.assertEqual(str(arg), 'x')
+
+        # Identities are not applied to operands that may not be numbers
+        for expr in (-(-arg), ~(~arg), arg * 1 - 0, arg + 0, Constant(0) + arg, arg ** 1):
+            self.assertIsNot(expr.optimize(), arg)
+            self.assertEqual(expr.optimize()(5), 5)
+        for expr in ((arg + 0) == 'a', -(-arg) == 'a', (arg - 0) == 'a'):
+            with self.assertRaises(TypeError):
+                expr.compile()('a')
+            self.assertFalse(Validator.from_spec(expr).validate('a'))
+
+        # ~(~x) is only simplified when x is an integer (~ raises an exception for floats)
+        self.assertIsInstance((~(~(len_(arg) // 2))).optimize(), BinaryOperation)
+        expr = ~(~(len_(arg) / 2))
+        self.assertIsInstance(expr.optimize(), UnaryOperation)
+        with self.assertRaises(TypeError):
+            expr.compile()('ab')
+
+        # Comparisons with constants on the left side are reversed
+        for expr, op in ((Constant(1) < arg, Operator.__gt__), (Constant(1) >= arg + 1, Operator.__le__),
+                         (Constant(1) == arg, Operator.__eq__)):
+            optimized = expr.optimize()
+            self.assertIs(optimized._op, op)
+            self.assertEqual(optimized._h._k, 1)
+            for x in range(-3, 3):
+                self.assertEqual(expr.compile()(x), expr(x))
+
+        # Operations that fail with constant operands are not folded
+        expr = Constant(1) // Constant(0) + arg
+        with self.assertRaises(ZeroDivisionError):
+            expr.compile()(1)
+
+
+    def test_logical_operators(self):
+        '''
+        Build expressions using the short-circuiting logical operators
+        :return:
+        '''
+        from src.operations import Operation, all_of, any_of, not_
+
+        class Double(Operation):
+            def __init__(self):
+                super().__init__('double(x)')
+                self.calls = 0
+
+            def __call__(self, x):
+                self.calls += 1
+                return 2 * x
+
+        double = Double()
+        exprs = [all_of(arg > 0, double > 5), any_of(arg > 0, double < -5), not_(double > 5),
+                 all_of(arg > 0, not_(arg > 10), any_of(arg == 3, arg == 4)),
+                 any_of(arg == 0, double > 5) | (double < 3)]
+        self.assertEqual(str(exprs[3]), '(x > 0) and not (x > 10) and ((x == 3) or (x == 4))')
+        self.assertEqual(str(not_(exprs[0])), 'not ((x > 0) and (double(x) > 5))')
+        for expr in exprs:
+            func = expr.compile()
+            for x in range(-5, 15):
+                self.assertEqual(func(x), expr(x))
+
+        # Only the operands needed are evaluated
+        for func in (exprs[0], exprs[0].compile()):
+            double.calls = 0
+            self.assertFalse(func(-1))
+            self.assertEqual(double.calls, 0)
+            self.assertTrue(func(3))
+            self.assertEqual(double.calls, 1)
+        self.assertEqual(any_of(arg, 0)(5), 5)
+        self.assertEqual(all_of(arg, 0)(5), 0)
+
+        # & and | are still bitwise operators
+        self.assertEqual(((arg & 4) | 1).compile()(6), 5)
+
+
+    def test_interning(self):
+        '''
+        Identical expressions share the same nodes
+        :return:
+        '''
+        import pickle
+        from src.operations import Operator, Constant, interned, all_of
+
+        a, b = (arg['price'] * 2 > 10) & (arg < 5), (arg['price'] * 2 > 10) & (arg < 5)
+        self.assertIs(a, b)
+        self.assertIs(a.compile(), b.compile())
+        self.assertIs(all_of(arg > 0, arg < 3), all_of(arg > 0, arg < 3))
+        self.assertIsNot(arg + 0, arg + 0.0)
+        self.assertIsNot(arg + 0.0, arg + -0.0)
+        self.assertIsNot(arg + [1], arg + [1])
+
+        # Structural equality and hashing
+        c, d = Constant(1) + arg * 2, Constant(1) + arg * 2
+        self.assertIsNot(c, d)
+        self.assertTrue(c.equals(d))
+        self.assertFalse(c.equals(Constant(2) + arg * 2))
+        self.assertEqual(len({c.key(), d.key()}), 1)
+
+        # Nodes are removed from the table when they are not used
+        count = len(interned)
+        e = arg * 1234567 - 7654321
+        self.assertEqual(len(interned), count + 4)
+        del e
+        self.assertEqual(len(interned), count)
+
+        # Predefined operators are pickled by reference
+        f = pickle.loads(pickle.dumps(arg + 1 > 2))
+        self.assertIs(f._op, Operator.__gt__)
+        self.assertIs(f._g._op, Operator.__add__)
+        self.assertEqual(f.compile()(2), True)
+
+
+    def test_attributes_and_calls(self):
+        '''
+        Build expressions accessing attributes, calling methods and builtins
+        :return:
+        '''
+        from src.operations import len_, abs_, min_, max_, isinstance_, getattr_, call
+        from math import sqrt
+
+        exprs = [
+            (isinstance_(arg, str) & (len_(arg) < 10), "isinstance(x, str) & (len(x) < 10)"),
+            (arg.startswith('x'), "x.startswith('x')"),
+            (arg.upper().count('X') == 2, "x.upper().count('X') == 2"),
+            (min_(len_(arg), 3) + max_(len_(arg), 5, key=abs), "min(len(x), 3) + max(len(x), 5, key=abs)"),
+            (getattr_(arg, 'format')(1), "x.format(1)")
+        ]
+        for expr, s in exprs:
+            self.assertEqual(str(expr), s)
+            func = expr.compile()
+            for x in ('xax', 'X', 'axXx{}', ''):
+                self.assertEqual(func(x), expr.evaluate(x))
+
+        expr = (abs_(arg.real) > 2) & (call(sqrt, arg.imag ** 2) < 1)
+        self.assertEqual(expr.format(-3+0.5j), '(abs((-3+0.5j).real) > 2) & (sqrt((-3+0.5j).imag ** 2) < 1)')
+        self.assertTrue(expr(-3+0.5j))
+        self.assertFalse(expr.compile()(-3+2j))
+
+        # Calling attributes builds method calls; evaluate() evaluates them
+        self.assertEqual(arg.real.evaluate(2+1j), 2)
+        self.assertIs(arg.upper(), arg.upper())
+        self.assertEqual(arg.upper()('a'), 'A')
+        self.assertEqual(arg.max.format(1), '1.max')
+        with self.assertRaises(AttributeError):
+            arg._private
+
+        # Attributes of the input values can have the same names as the fields of the operations
+        from types import SimpleNamespace
+        names = ('name', 'g', 'h', 'k', 'op', 'items', 'conjunction', 'func', 'args', 'kwargs', 'interned', 'compiled')
+        x = SimpleNamespace(x=SimpleNamespace(**{name: index for index, name in enumerate(names)}))
+        for index, name in enumerate(names):
+            expr = getattr(arg.x, name)
+            self.assertEqual(str(expr), 'x.x.{}'.format(name))
+            self.assertEqual(expr.compile()(x), index)
+            self.assertEqual(expr.evaluate(x), index)
+        self.assertEqual((arg.x.name + arg.x.g * arg.x.args).compile()(x), 0 + 1 * 8)
+
+
 
 
 if __name__ == '__main__':
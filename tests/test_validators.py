@@ -6,12 +6,13 @@ from decimal import Decimal
 from enum import Enum, auto
 from math import floor, sqrt
 
-from src.decorators import validate
+from src.decorators import validate, parse
 
 from src.validators import TypeValidator, UserValidator
 from src.validators import matchregex, fullmatchregex, number
 from src.validators import Int, Float, Bool, Complex, Str, List, Tuple, Set, FrozenSet, Dict
 from src.validators import array
+from src.processors import Sampler
 
 from src.exceptions import ValidationError
 
@@ -584,4 +585,752 @@ class TestValidators(TestCase):
 
         baz(np.ones([3,3]))
         with self.assertRaises(Exception):
-             baz(np.zeros([4,2]))
\ No newline at end of file
+             baz(np.zeros([4,2]))
+
+    def test_sampled_validation(self):
+        '''
+        Checks that only a fraction of the calls are validated when sampling is enabled, while parsers are applied
+        on every call.
+        :return:
+        '''
+        @validate(int, sample=0.25)
+        def foo(x):
+            return x
+
+        failures = 0
+        for k in range(0, 8):
+            try:
+                foo('a')
+            except ValidationError as e:
+                self.assertEqual(str(e), 'Invalid argument at position 1: Type int expected but got str')
+                failures += 1
+        self.assertEqual(failures, 2)
+
+        @validate(str)
+        @parse(int)
+        def bar(x):
+            return x
+
+        bar.sample_validation(0.5)
+        self.assertEqual([bar(1) if k % 2 else bar('1') for k in range(0, 4)], [1] * 4)
+        with self.assertRaises(ValidationError):
+            bar.call_generic(1)
+        self.assertEqual(bar.call_generic(1), 1)
+
+        bar.sample_validation(None)
+        for k in range(0, 2):
+            with self.assertRaises(ValidationError):
+                bar(1)
+
+        sampler = Sampler(0.5, random=True)
+        self.assertEqual(sampler.period, 2)
+        self.assertIsInstance(sampler(), bool)
+        with self.assertRaises(ValueError):
+            Sampler(0)
+        with self.assertRaises(TypeError):
+            Sampler('1')
+
+
+    def test_async_validators(self):
+        '''
+        Coroutine functions can be used as validators of coroutine functions arguments. They are awaited concurrently.
+        '''
+        import asyncio
+
+        # Number of validators running now and maximum number of validators that ran at once
+        running, concurrency = [0], [0]
+
+        async def exists(x):
+            running[0] += 1
+            concurrency[0] = max(concurrency[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            return x in ('a', 'b')
+
+        async def positive(x):
+            running[0] += 1
+            concurrency[0] = max(concurrency[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            if x == -2:
+                raise Exception('{} is negative'.format(x))
+            return x > 0
+
+        @validate(exists, Int & positive, str)
+        async def foo(x, y, z='c'):
+            return x, y, z
+
+        async def main(*args):
+            return await foo(*args)
+
+        self.assertEqual(asyncio.run(main('a', 1)), ('a', 1, 'c'))
+        self.assertEqual(concurrency[0], 2)
+
+        with self.assertRaises(ValidationError) as context:
+            asyncio.run(main('c', -1))
+        self.assertRegex(str(context.exception), '^Invalid argument at position 1: Expression .*exists\\(c\\) evaluated to false$')
+
+        with self.assertRaises(ValidationError) as context:
+            asyncio.run(main('a', -2))
+        self.assertEqual(str(context.exception), 'Invalid argument at position 2')
+
+        # Synchronous validators run before the coroutine is created
+        with self.assertRaises(ValidationError):
+            foo('a', 1, 2)
+        with self.assertRaises(ValidationError):
+            asyncio.run(main('a', 1.0))
+
+        foo.cancel_on_failure = True
+        with self.assertRaises(ValidationError) as context:
+            asyncio.run(main('c', -1))
+        self.assertEqual(asyncio.run(main('b', 2, 'd')), ('b', 2, 'd'))
+
+        self.assertTrue(UserValidator(exists).is_async)
+        with self.assertRaises(TypeError):
+            UserValidator(exists).validate('a')
+
+        # Only coroutine functions can be decorated with asynchronous validators
+        with self.assertRaises(TypeError):
+            @validate(exists)
+            def bar(x):
+                pass
+
+        with self.assertRaises(TypeError):
+            @validate(Int | exists)
+            async def qux(x):
+                yield x
+
+
+    def test_batch_validators(self):
+        '''
+        Batch validators check values from concurrent calls at once with a bulk lookup function.
+        '''
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        from src.validators import BatchValidator
+
+        batches = []
+        def exists(values):
+            batches.append(list(values))
+            return [value % 3 != 0 for value in values]
+
+        # The time window is never reached: batches are flushed when they are full
+        @validate(BatchValidator(exists, delay=60, max_size=10))
+        def foo(x):
+            return x
+
+        # Threads
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(foo, x) for x in range(1, 21)]
+        results = [future.exception() or future.result() for future in futures]
+        self.assertEqual(sorted(map(sorted, batches)), [list(range(1, 11)), list(range(11, 21))])
+        for x, result in zip(range(1, 21), results):
+            if x % 3 == 0:
+                self.assertIsInstance(result, ValidationError)
+                self.assertRegex(str(result), 'Expression .*exists\\(\\[{}\\]\\) evaluated to false'.format(x))
+            else:
+                self.assertEqual(result, x)
+
+        # Coroutines
+        async def lookup(values):
+            await asyncio.sleep(0)
+            return exists(values)
+
+        @validate(BatchValidator(lookup, delay=0.05, max_size=100))
+        async def bar(x):
+            return x
+
+        async def main():
+            return await asyncio.gather(*[bar(x) for x in range(1, 31)], return_exceptions=True)
+
+        del batches[:]
+        results = asyncio.run(main())
+        self.assertEqual(batches, [list(range(1, 31))])
+        self.assertEqual([x for x in results if not isinstance(x, ValidationError)], [x for x in range(1, 31) if x % 3])
+
+        def broken(values):
+            raise Exception('Lookup failed')
+        with self.assertRaises(ValidationError) as context:
+            validate(BatchValidator(broken, delay=0))(lambda x: x)(1)
+        self.assertEqual(str(context.exception), 'Invalid argument at position 1: Lookup failed')
+
+        # Columns of starmap() are looked up in batches of max_size values
+        @validate(BatchValidator(exists, delay=0, max_size=4))
+        def qux(x):
+            return x
+
+        del batches[:]
+        self.assertEqual(list(qux.map([1, 2, 4, 5, 7])), [1, 2, 4, 5, 7])
+        self.assertEqual(batches, [[1, 2, 4, 5], [7]])
+        with self.assertRaises(ValidationError) as context:
+            list(qux.map(range(1, 10)))
+        self.assertEqual(context.exception.row, 2)
+        self.assertEqual(batches[2:4], [[1, 2, 3, 4], [3]])
+        with self.assertRaises(ValidationError) as context:
+            list(validate(BatchValidator(broken, delay=0, max_size=2))(lambda x: x).map([1, 2, 3]))
+        self.assertEqual(context.exception.row, 0)
+
+
+    def test_parallel_validation(self):
+        '''
+        Test validate(..., executor=...)
+        '''
+        from concurrent.futures import ThreadPoolExecutor
+        from threading import Barrier
+        from time import sleep
+
+        # Expensive validators of different arguments run concurrently
+        barrier = Barrier(3, timeout=5)
+
+        def slow(x):
+            barrier.wait()
+            return x > 0
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            @validate(slow, slow, slow, executor=executor)
+            def foo(x, y, z):
+                return x + y + z
+
+            self.assertEqual(foo(1, 2, 3), 6)
+            self.assertIs(foo.caller.__wrapped__, foo.wrapped_func)
+
+            # The error reported refers to the argument with the lowest index
+            def check(x):
+                sleep(0.05 if x < 0 else 0)
+                return x > 0
+
+            bar = validate(check, check, int, check, executor=executor)(lambda x, y, z, w=1: x)
+            for k in range(0, 5):
+                with self.assertRaisesRegex(ValidationError, 'position 2'):
+                    bar(1, -1, 1, -1)
+                with self.assertRaisesRegex(ValidationError, 'position 3'):
+                    bar(1, 1, 'a', -1)
+            self.assertEqual(bar(1, 1, 1), 1)
+
+            # Cheap validators run serially
+            @validate(int, float, str, executor=executor)
+            def qux(x, y, z):
+                return x
+            self.assertEqual(qux(1, 1.0, 'a'), 1)
+            self.assertFalse(hasattr(qux.caller, '__wrapped__'))
+
+        with self.assertRaises(TypeError):
+            validate(int, executor=object())(lambda x: x)
+
+
+    def test_parallel_batch_validation(self):
+        '''
+        Test Validator.validate_parallel()
+        '''
+        import pickle
+        from src.validators import Validator, BatchValidator
+
+        validator = Validator.from_spec(arg ** 2 < 100) & Validator.from_spec(int)
+        values = list(range(-20, 20)) + [1.0]
+        expected = [index for index, value in enumerate(values) if not (isinstance(value, int) and value ** 2 < 100)]
+        self.assertEqual(len(expected), 22)
+
+        failures = validator.validate_parallel(values, processes=2, chunksize=7)
+        self.assertEqual([index for index, message in failures], expected)
+        self.assertEqual(failures, validator.validate_parallel(iter(values), processes=1))
+        self.assertEqual(Validator.from_spec(arg ** 2 < 100).validate_parallel(values, processes=2)[0],
+                         (0, 'Expression (-20 ** 2) < 100 evaluated to false'))
+        self.assertEqual(Validator.from_spec(int).validate_parallel([], processes=2), [])
+
+        # Validators and expressions can be pickled
+        self.assertEqual(str(pickle.loads(pickle.dumps((arg + 1) // 2 == 3))), '((x + 1) // 2) == 3')
+        self.assertTrue(pickle.loads(pickle.dumps(BatchValidator(sorted))).validate(1))
+
+        with self.assertRaises(TypeError):
+            Validator.from_spec(lambda x: x > 0).validate_parallel(values, processes=2)
+        with self.assertRaises(ValueError):
+            validator.validate_parallel(values, processes=0)
+
+
+    def test_common_subexpressions(self):
+        '''
+        Test that subexpressions shared by the validators of a composed validator are evaluated once.
+        '''
+        from src.validators import Validator
+        from src.operations import Operation
+
+        class Lookup(Operation):
+            def __init__(self):
+                super().__init__('price(x)')
+                self.calls = 0
+
+            def __call__(self, x):
+                self.calls += 1
+                return x['price']
+
+        price = Lookup()
+        validator = Validator.from_spec(price > 0) & Validator.from_spec(price < 1e6) & \
+            Validator.from_spec(price % 1 == 0)
+
+        @validate(validator)
+        def foo(x):
+            return x
+
+        self.assertEqual(foo({'price': 10}), {'price': 10})
+        self.assertEqual(price.calls, 1)
+
+        # Errors point to the expression that failed
+        with self.assertRaises(ValidationError) as context:
+            foo({'price': 2.5})
+        self.assertIn("Expression (price({'price': 2.5}) % 1) == 0 evaluated to false", str(context.exception))
+        with self.assertRaises(ValidationError) as context:
+            foo({'price': -1})
+        self.assertIn("Expression price({'price': -1}) > 0 evaluated to false", str(context.exception))
+        with self.assertRaises(ValidationError):
+            foo({})
+
+        validator = Validator.from_spec(arg['price'] < 0) | Validator.from_spec(arg['price'] > 10) | \
+            Validator.from_spec(str)
+        for x, valid in (({'price': -1}, True), ({'price': 20}, True), ({'price': 5}, False), ('a', True), ({}, False)):
+            self.assertEqual(bool(validator.validate(x)), valid)
+
+
+    def test_attribute_expressions(self):
+        '''
+        Test validators and parsers defined with expressions that access attributes and call methods or builtins
+        '''
+        from src.operations import len_
+
+        @parse(arg.strip())
+        @validate(arg.startswith('a') & (len_(arg) < 5))
+        def foo(x):
+            return x
+
+        self.assertEqual(foo('abc'), 'abc')
+        self.assertEqual(foo.call_generic('  ab '), 'ab')
+        with self.assertRaises(ValidationError) as context:
+            foo('abcdef')
+        self.assertIn("Expression 'abcdef'.startswith('a') & (len('abcdef') < 5) evaluated to false",
+                      str(context.exception))
+
+
+    def test_vectorized_expressions(self):
+        '''
+        Test expression validators with numpy arrays.
+        This test will only be executed if numpy module is avaliable.
+        '''
+        try:
+            import numpy as np
+        except:
+            return
+        from src.validators import Validator, UserValidator
+
+        @validate((arg >= 0) & (arg <= 1))
+        def foo(x):
+            return x
+
+        x = np.linspace(0, 1, 100)
+        self.assertIs(foo(x), x)
+        x[[37, 80]] = 2
+        with self.assertRaises(ValidationError) as context:
+            foo(x)
+        self.assertIn('Expression (x >= 0) & (x <= 1) evaluated to false for 2 of 100 elements (first one at index 37)',
+                      str(context.exception))
+        self.assertEqual(foo(0.5), 0.5)
+        self.assertEqual(foo(np.float64(0.5)), 0.5)
+
+        # Evaluation in chunks (also for non contiguous arrays)
+        calls = []
+        validator = UserValidator((arg >= 0) & (arg <= 1), chunksize=10)
+        validator.predicate = (lambda predicate: lambda x: calls.append(x.size) or predicate(x))(validator.predicate)
+        self.assertFalse(validator.validate(x))
+        self.assertEqual(calls, [10] * 4)
+        del calls[:]
+        self.assertIn('for 2 of 100 elements (first one at index (0, 8))', validator.error_message(x.reshape(10, 10).T))
+        self.assertEqual(calls, [10] * 10)
+        self.assertTrue(validator.validate(np.zeros((7, 3, 5))))
+
+        # Expressions that are not elementwise are evaluated at once
+        validator = Validator.from_spec(arg.sum(axis=0) > 1)
+        self.assertIsNone(validator.chunksize)
+        self.assertIn('for 4 of 4 elements (first one at index 0)', validator.error_message(np.full((3, 4), 0.1)))
+        validator = Validator.from_spec(arg.shape[0] == 3)
+        self.assertTrue(validator.validate(np.zeros((3, 2))))
+        self.assertEqual(validator.error_message(np.zeros(2)), 'Expression (x.shape[0]) == 3 evaluated to false')
+
+        # Composed expression validators check arrays with each validator (not with their joint predicate)
+        validator = Validator.from_spec(arg.ndim == 1) & Validator.from_spec(arg * 2 >= 0)
+        x = np.array([1, 2, 3])
+        self.assertTrue(validator.validate(x))
+        self.assertFalse(validator.validate(np.array([1, -2, 3])))
+        self.assertFalse(validator.validate(np.zeros((2, 2))))
+        self.assertFalse(validator.validate(2))
+
+        @validate(validator)
+        def bar(x):
+            return x
+
+        self.assertIs(bar(x), x)
+        with self.assertRaises(ValidationError):
+            bar(np.array([1, -2, 3]))
+
+        validator = Validator.from_spec(arg.ndim == 2) | Validator.from_spec(arg >= 0)
+        self.assertTrue(validator.validate(x))
+        self.assertTrue(validator.validate(np.full((2, 2), -1)))
+        self.assertFalse(validator.validate(np.array([-1, 2])))
+
+
+    def test_lowered_expressions(self):
+        '''
+        Test that simple expressions are replaced with native validators
+        '''
+        from src.validators import Validator, LoweredValidator, IntervalValidator, MembershipValidator
+        from src.operations import all_of, any_of, isinstance_
+        from numbers import Number
+
+        cases = [
+            ((arg >= 0) & (arg < 256), IntervalValidator, [0, 255, 10.5, True], [-1, 256, 300.0, float('nan'), 'a']),
+            (all_of(arg > 0, arg <= 10, arg > 5), IntervalValidator, [6, 10, 5.5], [5, 10.5, None]),
+            (arg < 1e3, IntervalValidator, [-5, 999.9], [1e3, 'a']),
+            ((arg == 'a') | (arg == 'b'), MembershipValidator, ['a', 'b'], ['c', 1, None, b'a']),
+            (any_of(arg == 1, arg == None), MembershipValidator, [1, 1.0, True, None], [2, '1', False]),
+            (isinstance_(arg, (int, str)), TypeValidator, [1, True, 'a'], [1.0, None]),
+            (isinstance_(arg, Number), TypeValidator, [1, True, 1.5], ['a'])
+        ]
+        for expr, cls, valid, invalid in cases:
+            validator = Validator.from_spec(expr)
+            self.assertIsInstance(validator, LoweredValidator)
+            self.assertIsInstance(validator.native, cls)
+            for x in valid:
+                self.assertTrue(validator.validate(x))
+                self.assertTrue(validator(x))
+            for x in invalid:
+                self.assertFalse(validator.validate(x))
+                with self.assertRaises(Exception):
+                    validator(x)
+
+        # Error messages are the same as the ones of the expressions
+        @validate((arg >= 0) & (arg < 256), (arg == 'a') | (arg == 'b'))
+        def foo(x, y):
+            return x, y
+
+        self.assertEqual(foo(5, 'a'), (5, 'a'))
+        with self.assertRaises(ValidationError) as context:
+            foo(300, 'a')
+        self.assertIn('Expression (300 >= 0) & (300 < 256) evaluated to false', str(context.exception))
+        with self.assertRaises(ValidationError) as context:
+            foo(1, 'c')
+        self.assertIn("Expression ('c' == 'a') | ('c' == 'b') evaluated to false", str(context.exception))
+
+        # Arguments out of the domain of the native validator are validated evaluating the expression
+        from decimal import Decimal
+        self.assertTrue(foo(Decimal('3.5'), 'b'))
+        with self.assertRaises(ValidationError):
+            foo({1}, 'a')
+
+        # Other expressions are not lowered
+        for expr in ((arg > 0) | (arg < -5), (arg >= 0) & (arg < 'a'), (arg == [1]) | (arg == 2),
+                     (arg == float('nan')) | (arg == 1), arg * 2 > 0, isinstance_(arg, int) == False):
+            self.assertNotIsInstance(Validator.from_spec(expr), LoweredValidator)
+
+        # Expressions are only lowered when they are equivalent for all the arguments
+        from src.operations import Constant
+        self.assertIsInstance(Validator.from_spec((Constant(0) < arg) & (arg < 5)).native, IntervalValidator)
+        for expr in ((arg + 0) == 'a', -(-arg) == 'a', ((arg - 0) == 'a') | (arg == 'b'), (arg * 1 >= 0) & (arg < 5)):
+            validator = Validator.from_spec(expr)
+            self.assertNotIsInstance(validator, LoweredValidator)
+            self.assertFalse(validator.validate('a'))
+
+        # Comparisons with NaN are always false (NaN cannot be a bound of an interval)
+        validator = Validator.from_spec((arg > 0) & (arg > float('nan')))
+        self.assertNotIsInstance(validator, LoweredValidator)
+        self.assertFalse(validator.validate(5))
+
+
+    def test_value_validator_index(self):
+        '''
+        Test that ValueValidator finds values without comparing the argument with all of them.
+        '''
+        from src.validators import ValueValidator
+
+        class Value:
+            comparisons = 0
+            __hash__ = None
+
+            def __eq__(self, other):
+                Value.comparisons += 1
+                return isinstance(other, Value)
+
+        validator = ValueValidator(list(range(0, 10000)) + ['a', [1, 2], {'k': [1]}, {3}, 2.0, Value()])
+        for x in (1, 9999, 'a', [1, 2], {'k': [1]}, {3}, 2.0, Value()):
+            self.assertTrue(validator.validate(x))
+        # Types must match exactly
+        for x in (True, 1.0, 'b', (1, 2), {'k': (1,)}, frozenset({3}), -1, 10000, None, [1, [2]]):
+            self.assertFalse(validator.validate(x))
+
+        # Only the values which cannot be hashed are compared one by one
+        Value.comparisons = 0
+        self.assertTrue(validator.validate(5000))
+        self.assertEqual(Value.comparisons, 0)
+        self.assertTrue(validator.validate(Value()))
+        self.assertEqual(Value.comparisons, 1)
+        self.assertFalse(ValueValidator(range(0, 10)).validate(Value()))
+
+
+    def test_interval_union_validator(self):
+        '''
+        Test unions of ranges and intervals
+        '''
+        from src.validators import Validator, IntervalUnionValidator, IntervalValidator as interval
+
+        # Ranges (only int values are valid)
+        validator = Validator.from_spec([range(0, 10), range(5, 20), range(30, 40), range(20, 25)])
+        self.assertIsInstance(validator, IntervalUnionValidator)
+        self.assertEqual(validator.lowers, [0, 30])
+        self.assertEqual(validator.uppers, [25, 40])
+        for x in (0, 9, 10, 24, 30, 39):
+            self.assertTrue(validator.validate(x))
+        for x in (-1, 25, 29, 40, 5.0, True, '1', None):
+            self.assertFalse(validator.validate(x))
+        self.assertEqual(validator.error_message(25), 'Value in [0, 25) or [30, 40) expected but got 25')
+
+        # Intervals with open and closed bounds, floats and decimals
+        validator = Validator.from_spec([interval(0, 1, True, True), interval(1, 2, False, False),
+                                         interval(Decimal('2.5'), None, False), interval(None, -10, upper_closed=True),
+                                         interval(3, 3.5)])
+        self.assertEqual(len(validator.lowers), 3)
+        for x in (0, 0.5, 1, Decimal('1.5'), 2.6, Decimal('2.51'), 10 ** 30, float('inf'), -10, float('-inf')):
+            self.assertTrue(validator.validate(x))
+        for x in (-1, 2, 2.5, Decimal('2.5'), -9.99, float('nan'), 'a', None):
+            self.assertFalse(validator.validate(x))
+        self.assertEqual(validator.error_message(2),
+                         'Value in (-inf, -10] or [0, 2) or (2.5, +inf) expected but got 2')
+
+        @validate([interval(0, 1, True, True), interval(5, 6)])
+        def foo(x):
+            return x
+        self.assertEqual(foo(5.5), 5.5)
+        with self.assertRaises(ValidationError):
+            foo(3)
+
+        # Vectorized lookups
+        try:
+            import numpy as np
+        except:
+            return
+        x = np.array([[-11, -10, -9.5], [0, 1, 1.5], [2, 2.5, 1e9]])
+        self.assertEqual(validator.contains(x).tolist(), [[True, True, False], [True, True, True], [False, False, True]])
+        self.assertTrue(validator.validate(np.array([0, 0.5, 1e9])))
+        self.assertFalse(validator.validate(x))
+        self.assertEqual(Validator.from_spec([range(0, 5), range(10, 15)]).contains(np.arange(0, 16)).tolist(),
+                         [k in range(0, 5) or k in range(10, 15) for k in range(0, 16)])
+
+
+    def test_disjunct_dispatch(self):
+        '''
+        Test that DisjunctValidator only tries the validators that can accept arguments of the same type.
+        '''
+        from src.validators import DisjunctValidator, ValueValidator, Validator
+        from abc import ABC
+        from collections.abc import Sequence
+
+        class Base(ABC):
+            pass
+
+        calls = []
+        def positive(x):
+            calls.append(x)
+            return x > 0
+
+        validator = DisjunctValidator([float, None, 'auto', range(0, 10), positive, Base, Str])
+        self.assertEqual(validator.types, (float, Base, str))
+        self.assertIsInstance(validator.values, ValueValidator)
+        for x in (1.5, None, 'auto', 'foo', 0, 9, 20):
+            self.assertTrue(validator.validate(x))
+        for x in (-1, b'auto', []):
+            self.assertFalse(validator.validate(x))
+        # Arguments are only checked by the validators that can accept them
+        calls.clear()
+        self.assertTrue(validator.validate(1.5))
+        self.assertTrue(validator.validate(5))
+        self.assertEqual(calls, [])
+        self.assertTrue(validator.validate(20))
+        self.assertEqual(calls, [20])
+        self.assertIs(validator.table[float], True)
+
+        # bool is not considered an int
+        validator = DisjunctValidator([int, None])
+        self.assertTrue(validator.validate(1))
+        self.assertFalse(validator.validate(True))
+        self.assertTrue(DisjunctValidator([bool, None]).validate(False))
+        self.assertFalse(DisjunctValidator([bool, None]).validate(0))
+
+        # Registering new virtual subclasses invalidates the dispatch table
+        class Foo:
+            pass
+        validator = DisjunctValidator([Base, None])
+        self.assertFalse(validator.validate(Foo()))
+        Base.register(Foo)
+        self.assertTrue(validator.validate(Foo()))
+        self.assertTrue(DisjunctValidator([Sequence, None]).validate((1,)))
+
+        # Values that are equal but have different types are merged without losing any of them
+        validator = Validator.from_spec([1, 'a', (0, 5), True, 2.0, 2])
+        self.assertEqual([validator.validate(x) for x in (True, 2.0, 2, 1, 0, 'a', False, 1.0)],
+                         [True, True, True, True, True, True, False, False])
+        validator = ValueValidator([1, True, 1.0])
+        self.assertTrue(all(validator.validate(x) for x in (1, True, 1.0)))
+        self.assertFalse(validator.validate(Decimal(1)))
+        validator = DisjunctValidator([ValueValidator([1]), ValueValidator([True, 1.0]), str])
+        self.assertTrue(all(validator.validate(x) for x in (1, True, 1.0)))
+        self.assertFalse(validator.validate(False))
+
+        # Objects whose class is not their type are checked with isinstance()
+        from unittest import mock
+        for validator in (Validator.from_spec([int, None]), Validator.from_spec([int, str])):
+            self.assertTrue(validator.validate(mock.Mock(spec=int)))
+            self.assertFalse(validator.validate(mock.Mock(spec=float)))
+            self.assertTrue(validator.validate(1))
+
+    def test_adaptive_order(self):
+        '''
+        Test that adaptive composed validators try first the validators that decide the result sooner.
+        '''
+        from src.validators import DisjunctValidator, ConjunctValidator
+        from time import sleep
+
+        # A slow expression that rarely matches is tried after the type check once the validator adapts
+        slow = UserValidator(arg.count('a') > 100)
+        self.assertFalse(slow.is_pure)
+        slow = UserValidator(arg['id'] > 10 ** 6)
+        self.assertTrue(slow.is_pure)
+        validator = DisjunctValidator([slow, int], adaptive=True)
+        self.assertTrue(validator.is_pure)
+        for k in range(0, 5000):
+            self.assertTrue(validator.validate(k))
+        self.assertFalse(validator.validate('a'))
+        stats = validator.stats()
+        self.assertIs(stats[0]['validator'], validator.validators[1])
+        self.assertEqual(stats[0]['position'], 1)
+        self.assertEqual(stats[0]['exit_rate'], 1)
+        self.assertGreater(validator.profile.reorders, 0)
+        self.assertIsNone(DisjunctValidator([int, str]).stats())
+
+        # Conjunctions try first the validators that reject the arguments
+        validator = ConjunctValidator([object, arg >= 0, arg < 10], adaptive=True)
+        for k in range(0, 5000):
+            self.assertEqual(validator.validate(k), k < 10)
+        self.assertEqual(validator.stats()[0]['position'], 2)
+        with self.assertRaises(Exception):
+            validator(-1)
+
+        # Validators with side effects are never moved (and validators are not moved across them)
+        calls = []
+        def impure(x):
+            calls.append(x)
+            return False
+        validator = DisjunctValidator([arg > 1000, impure, arg < 1000], adaptive=True)
+        self.assertFalse(validator.is_pure)
+        for k in range(0, 5000):
+            validator.validate(k)
+        self.assertEqual([item['position'] for item in validator.stats()], [0, 1, 2])
+        self.assertEqual(len(calls), 1001)
+
+    def test_optimize(self):
+        '''
+        Test that composed validators are simplified without changing which arguments are valid.
+        '''
+        from src.validators import DisjunctValidator, ConjunctValidator, XorValidator
+        from src.validators import EmptyValidator, Validator
+
+        # Nested disjunctions and conjunctions are flattened
+        validator = ((Int | Str) | (Float | (arg > 0))).optimize()
+        self.assertIsInstance(validator, DisjunctValidator)
+        self.assertEqual(len(validator.validators), 4)
+        validator = ConjunctValidator([arg > 0, ConjunctValidator([arg < 10, arg != 5])]).optimize()
+        self.assertIsInstance(validator, ConjunctValidator)
+        self.assertEqual(len(validator.validators), 3)
+
+        # Double inversions are removed
+        self.assertIs((~~Int).optimize(), Int)
+        self.assertIs((~(~Int | ~Int)).optimize(), Int)
+
+        # Type checks implied by others are dropped
+        self.assertIs((Int & number).optimize(), Int)
+        self.assertIs((number & Int).optimize(), Int)
+        self.assertIs((Int | number).optimize(), number)
+        self.assertIs((Bool | Int).optimize().validate(True), True)
+        self.assertEqual(len((Bool | Int).optimize().validators), 2)
+        self.assertIs((Str & matchregex('a+')).optimize().prog.pattern, 'a+')
+
+        # Empty validators
+        empty = Validator.from_spec(object)
+        self.assertIsInstance((Int | empty).optimize(), EmptyValidator)
+        self.assertIs((Int & empty).optimize(), Int)
+        self.assertIs((Int ^ empty).optimize().validator, Int)
+        calls = []
+        validator = (UserValidator(lambda x: calls.append(x)) | empty | Int).optimize()
+        self.assertEqual(len(validator.validators), 2)
+        self.assertTrue(validator.validate(1))
+        self.assertEqual(calls, [1])
+
+        # Composed validators that cannot be optimized are not copied
+        validator = Int | (arg > 0)
+        self.assertIs(validator.optimize(), validator)
+
+        # Xor validators call each validator once
+        calls = []
+        def positive(x):
+            calls.append(x)
+            return x > 0
+        validator = Int ^ UserValidator(positive)
+        self.assertIsInstance(validator, XorValidator)
+        self.assertEqual([validator.validate(x) for x in (1, -1, 1.5, -1.5)], [False, True, True, False])
+        self.assertEqual(calls, [1, -1, 1.5, -1.5])
+        self.assertIs((~Int ^ ~Str).optimize().left, Int)
+
+        @validate((Int & number) | (~~Str ^ matchregex('a')))
+        def foo(x):
+            return x
+        self.assertEqual(foo(1), 1)
+        self.assertEqual(foo('b'), 'b')
+        with self.assertRaises(ValidationError):
+            foo('a')
+        with self.assertRaises(ValidationError):
+            foo(1.5)
+
+    def test_type_verdicts_cache(self):
+        '''
+        Test that TypeValidator caches the results of instance checks against abstract base classes by type.
+        '''
+        from numbers import Number as NumberABC
+        from collections.abc import Mapping
+        from abc import ABC
+        import pickle
+
+        validator = TypeValidator((NumberABC, Mapping))
+        for x in (1, 2.5, {}, 3, Decimal(1), {'a': 1}):
+            self.assertTrue(validator.validate(x))
+        for x in ('a', [], True, None, 'b'):
+            self.assertFalse(validator.validate(x))
+        info = validator.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (3, 7, 7))
+        self.assertIsNone(Int.cache_info())
+        self.assertTrue(TypeValidator((bool, NumberABC)).validate(True))
+
+        # The cache is cleared when new virtual subclasses are registered
+        class Base(ABC):
+            pass
+        class Foo:
+            pass
+        validator = TypeValidator((Base,))
+        self.assertFalse(validator.validate(Foo()))
+        self.assertFalse(validator.validate(Foo()))
+        Base.register(Foo)
+        self.assertTrue(validator.validate(Foo()))
+        self.assertEqual(validator.cache_info().currsize, 1)
+
+        validator = pickle.loads(pickle.dumps(TypeValidator((Mapping,))))
+        self.assertTrue(validator.validate({}))
+
+        # Objects whose class is not their type are not cached
+        from unittest import mock
+        validator = TypeValidator((NumberABC,))
+        self.assertTrue(validator.validate(mock.Mock(spec=int)))
+        self.assertFalse(validator.validate(mock.Mock()))
+        self.assertEqual(validator.cache_info().currsize, 1)
@@ -4,6 +4,9 @@
 # Decorators
 from src.decorators import validate, parse
 
+# Global switch for validation
+from src.wrappers import enable_validation, disable_validation, validation_enabled
+
 # Type validators
 from src.validators import Int, Float, Bool, Complex, Str, Bytes, ByteArray
 from src.validators import List, Tuple, Set, FrozenSet
@@ -16,7 +19,16 @@ from src.validators import matchregex, fullmatchregex
 from src.validators import array, Array
 
 # Misc validators
-from src.validators import iterable, hashable
+from src.validators import iterable, hashable, batch
+
+# Interval validators
+from src.validators import interval
 
 # Argument placeholder
 from src.operations import placeholder, arg
+
+# Short-circuiting logical operations
+from src.operations import all_of, any_of, not_
+
+# Attributes, function calls and builtins in expressions
+from src.operations import getattr_, call, len_, abs_, min_, max_, sum_, round_, isinstance_